@@ -72,6 +72,9 @@ cp "$LIB_PYTHON_PATH" "$BUILD_DIR"
 
 export PYTHONPATH="${PYTHONPATH}:$(pwd)/src"
 
+echo "Pre-generating the repo config snapshot..."
+poetry run python -m core.repo_registry config/repos config/repos.snapshot
+
 echo "Creating spec file..."
 cat << 'EOF' > 64All.spec
 # Imports and necessary utilities
@@ -112,6 +115,9 @@ datas.extend(my_package_datas)
 yaml_files = [(os.path.join("config", "repos", f), "config/repos") for f in os.listdir("config/repos") if f.endswith(".yaml")]
 datas.extend(yaml_files)
 
+# Parsed repo configs, so the frozen build doesn't have to parse YAML on first start
+datas.append((os.path.join("config", "repos.snapshot"), "config"))
+
 # Collect all image files from the config/images directory
 icon_file = os.path.join('config', 'images', 'basedtuxicon.ico')
 image_files = [(os.path.join("config", "images", f), "config/images") for f in os.listdir("config/images") if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif'))]
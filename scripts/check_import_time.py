@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Fail if importing what the first window needs gets too slow.
+
+Runs ``python -X importtime`` on the modules imported before the main window
+is shown, in a fresh interpreter, and checks two things:
+
+- none of the modules that should only load once Build is clicked (GitPython,
+  PyYAML, distro, asyncio) is imported at startup;
+- the total import time stays under a budget (best of a few runs, since the
+  numbers are noisy).
+
+Usage: python scripts/check_import_time.py [--budget-ms 600] [--runs 3]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_IMPORTS = "import main, ui.primary_window, ui.signal_connections"
+LAZY_MODULES = ("git", "yaml", "distro", "asyncio")
+
+
+def measure():
+    """Return {module: (self_us, cumulative_us)} for one cold interpreter."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.join(PROJECT_ROOT, "src")
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_IMPORTS],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing the startup modules failed:\n{result.stderr}")
+
+    # "import time:       123 |       4567 |   package.module"
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].strip()
+        modules[name] = (int(fields[0]), int(fields[1]))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=600)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to show")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(max(1, args.runs))]
+    modules = min(runs, key=lambda run: sum(self_us for self_us, _ in run.values()))
+    total_ms = sum(self_us for self_us, _ in modules.values()) / 1000
+
+    print(f"Startup imports: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print("Slowest (cumulative):")
+    slowest = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (_, cumulative_us) in slowest[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = sorted(name for name in modules if name.split(".")[0] in LAZY_MODULES)
+    if eager:
+        print(f"Imported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"Startup imports are over budget by {total_ms - args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import re
+import sys
+import time
+
+# SGR sequences with or without the leading ESC (our own status messages use the
+# bare "[32m" form), plus any other CSI sequence, which is dropped.
+_ESCAPE_PATTERN = re.compile(
+    r"(?:\x1b\[|\[(?=[0-9]))([0-9;]*)m|\x1b\[[0-9;?]*[ -/]*[@-~]"
+)
+# A sequence that was cut in half at the end of a chunk.
+_PARTIAL_ESCAPE_PATTERN = re.compile(r"(?:\x1b(?:\[[0-9;?]*[ -/]*)?|\[[0-9;]*)\Z")
+
+DEFAULT_STYLE = (None, False)
+
+# "Receiving objects:  45% (9/20)", "Progress: 1,024 out of 9,000": a label,
+# then a percentage or a count of a total (not just any number)
+_PROGRESS_PATTERN = re.compile(
+    r"\s*([A-Za-z][A-Za-z ]*):\s*"
+    r"(?:\d[\d.]*%|\d[\d,]* out of \d|\d[\d,]*, max count unknown|.*\(\d+/\d+\))"
+)
+
+
+def strip_ansi(text):
+    """Remove SGR/CSI escape sequences from a string."""
+    return _ESCAPE_PATTERN.sub("", text)
+
+
+def is_progress_update(previous, line):
+    """
+    True if a plain (escape-free) line is an update of the previous one that
+    should replace it: it extends it, or both report progress (a percentage
+    or n of m) of the same step.
+    """
+    if not previous.strip():
+        return False
+    if line.startswith(previous.rstrip()):
+        return True
+    previous_match = _PROGRESS_PATTERN.match(previous)
+    match = _PROGRESS_PATTERN.match(line)
+    return bool(previous_match and match and previous_match.group(1) == match.group(1))
+
+
+def merge_runs(runs):
+    """Join adjacent runs that share the same style."""
+    merged = []
+    parts = []
+    current_style = None
+    for text, style in runs:
+        if style != current_style and parts:
+            merged.append(("".join(parts), current_style))
+            parts = []
+        current_style = style
+        parts.append(text)
+    if parts:
+        merged.append(("".join(parts), current_style))
+    return merged
+
+
+class AnsiStreamParser:
+    """
+    Incremental ANSI SGR parser.
+
+    Text is fed in arbitrary chunks and comes back as a list of
+    ``(text, style)`` runs, where ``style`` is a ``(foreground, bold)`` tuple.
+    The current style and any escape sequence split across chunks carry over
+    to the next call to :meth:`feed`.
+    """
+
+    def __init__(self, style=DEFAULT_STYLE):
+        self.foreground, self.bold = style
+        self._carry = ""
+
+    @property
+    def style(self):
+        return self.foreground, self.bold
+
+    def reset(self, style=DEFAULT_STYLE):
+        self.foreground, self.bold = style
+        self._carry = ""
+
+    def feed(self, text):
+        """Parse a chunk of text and return the styled runs it contains."""
+        if self._carry:
+            text = self._carry + text
+            self._carry = ""
+        if text.endswith("\r"):
+            # Could be the first half of a CRLF pair
+            self._carry = "\r"
+            text = text[:-1]
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+        partial = _PARTIAL_ESCAPE_PATTERN.search(text, max(0, len(text) - 32))
+        if partial:
+            self._carry = text[partial.start() :] + self._carry
+            text = text[: partial.start()]
+
+        runs = []
+        position = 0
+        for match in _ESCAPE_PATTERN.finditer(text):
+            if match.start() > position:
+                runs.append((text[position : match.start()], self.style))
+            position = match.end()
+            params = match.group(1)
+            if params is not None:
+                self._apply_sgr(params)
+        if position < len(text):
+            runs.append((text[position:], self.style))
+        return runs
+
+    def flush(self):
+        """Return whatever is left in the carry buffer as plain text."""
+        carry, self._carry = self._carry, ""
+        carry = carry.replace("\r", "\n")
+        return [(carry, self.style)] if carry else []
+
+    def _apply_sgr(self, params):
+        codes = [int(code) if code else 0 for code in params.split(";")]
+        index = 0
+        while index < len(codes):
+            code = codes[index]
+            if code == 0:
+                self.foreground, self.bold = DEFAULT_STYLE
+            elif code == 1:
+                self.bold = True
+            elif code == 22:
+                self.bold = False
+            elif 30 <= code <= 37:
+                self.foreground = code
+            elif 90 <= code <= 97:
+                # Bright colours fall back to the regular palette entry
+                self.foreground = code - 60
+            elif code == 39:
+                self.foreground = None
+            elif code in (38, 48):
+                # Extended colours: skip "5;n" or "2;r;g;b"
+                if index + 1 < len(codes) and codes[index + 1] == 5:
+                    index += 2
+                elif index + 1 < len(codes) and codes[index + 1] == 2:
+                    index += 4
+            index += 1
+
+
+def benchmark(line_count=200_000, chunk_lines=64):
+    """Measure parser throughput on synthetic make output, in lines per second."""
+    sample = [
+        "gcc -c -Iinclude -Isrc -O2 -DVERSION_US -o build/us_pc/src/game/object_{0}.o src/game/object_{0}.c",
+        "\x1b[01m\x1b[Ksrc/game/object_{0}.c:12:5:\x1b[m\x1b[K \x1b[01;35m\x1b[Kwarning: \x1b[m\x1b[Kunused variable",
+        "[32m Progress: {0:,} out of 9,000 (12.50%) [0m[36m Message: Receiving objects [0m",
+        "python3 tools/extract_assets.py us",
+    ]
+    lines = [sample[i % len(sample)].format(i) for i in range(line_count)]
+    chunks = [
+        "\n".join(lines[i : i + chunk_lines]) + "\n"
+        for i in range(0, line_count, chunk_lines)
+    ]
+
+    parser = AnsiStreamParser()
+    start = time.perf_counter()
+    run_count = 0
+    for chunk in chunks:
+        run_count += len(merge_runs(parser.feed(chunk)))
+    elapsed = time.perf_counter() - start
+
+    lines_per_second = line_count / elapsed if elapsed else float("inf")
+    print(
+        f"Parsed {line_count:,} lines into {run_count:,} runs in {elapsed:.3f}s "
+        f"({lines_per_second:,.0f} lines/s)"
+    )
+    return lines_per_second
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+
+from core.installer import install_files
+from core.paths import CACHE_DIR, ensure_dir
+from core.trash import trash
+
+ASSET_CACHE_DIR = os.path.join(CACHE_DIR, "assets")
+# The decomp's extractor and the list of assets it writes; a fork that
+# changes either extracts different files
+EXTRACTOR_FILES = ("extract_assets.py", "assets.json")
+# Written by extract_assets.py; when it's up to date the script does nothing
+EXTRACTED_MARKER = ".assets-local.txt"
+
+
+def cache_key(workspace, rom_sha1):
+    """
+    Key of the assets a workspace would extract from a ROM, or None if the
+    fork doesn't use the decomp's extract_assets.py.
+    """
+    digest = hashlib.sha1(rom_sha1.encode())
+    for name in EXTRACTOR_FILES:
+        try:
+            with open(os.path.join(workspace, name), "rb") as file:
+                digest.update(hashlib.sha1(file.read()).digest())
+        except FileNotFoundError:
+            return None
+    return digest.hexdigest()
+
+
+def asset_paths(workspace):
+    """Relative paths of the files extract_assets.py writes."""
+    with open(os.path.join(workspace, "assets.json"), "r") as file:
+        return [path for path in json.load(file) if not path.startswith("@")]
+
+
+def seed_workspace(workspace, key, cache_dir=ASSET_CACHE_DIR):
+    """
+    Put previously extracted assets into a fresh workspace. Returns the number
+    of files, 0 if there's nothing cached for this key.
+    """
+    entry = os.path.join(cache_dir, key)
+    if not os.path.isdir(entry):
+        return 0
+    os.utime(entry)  # Last use, for the cache budget
+    pairs = []
+    for directory, _, filenames in os.walk(entry):
+        for name in filenames:
+            source = os.path.join(directory, name)
+            pairs.append(
+                (source, os.path.join(workspace, os.path.relpath(source, entry)))
+            )
+    # Never hardlinked: a build rewriting a file in place (the marker always
+    # is) would change the cached copy too
+    strategies, _ = install_files(pairs, allow_hardlink=False)
+    for _, target in pairs:
+        # Writable again, the cached files are read-only
+        os.chmod(target, os.stat(target).st_mode | 0o200)
+    return sum(strategies.values())
+
+
+def save_workspace(workspace, key, cache_dir=ASSET_CACHE_DIR):
+    """Keep the assets of a successful build for the next one. Returns the number of files."""
+    entry = os.path.join(cache_dir, key)
+    if os.path.isdir(entry):
+        return 0
+    paths = [
+        path
+        for path in asset_paths(workspace) + [EXTRACTED_MARKER]
+        if os.path.isfile(os.path.join(workspace, path))
+    ]
+    if not paths:
+        return 0
+
+    partial = os.path.join(ensure_dir(cache_dir), f".{key}.partial")
+    trash.move(partial)
+    pairs = [
+        (os.path.join(workspace, path), os.path.join(partial, path)) for path in paths
+    ]
+    install_files(pairs, allow_hardlink=False)
+    for _, target in pairs:
+        os.chmod(target, os.stat(target).st_mode & ~0o222)
+    os.rename(partial, entry)
+    return len(paths)
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import re
+import subprocess
+import tarfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from core.installer import install_files, walk_files
+from core.paths import CACHE_DIR, ensure_dir
+from core.trash import trash
+
+PACK_CACHE_DIR = os.path.join(CACHE_DIR, "packs")
+# Written into an extracted pack once it's complete
+PACK_MARKER = ".64all-pack.json"
+
+# A special option of a repo config that installs a git repo into res/:
+# ``source`` is the directory of the pack to install, ``target`` where it
+# goes under res/
+AssetPack = namedtuple("AssetPack", "name url branch source target")
+
+
+class AssetPackError(Exception):
+    pass
+
+
+def configured_packs(repo, selections=None):
+    """
+    The asset packs a repo's special_options enable, skipping those without
+    a URL. ``selections`` are the user's choices, defaults are used for the
+    options missing from it.
+    """
+    selections = selections or {}
+    packs = []
+    special_options = repo.get("info", {}).get("special_options", {}) or {}
+    for name, option in special_options.items():
+        if not selections.get(name, option.get("default")):
+            continue
+        if not option.get("url"):
+            print(f"{name}: no pack URL configured, skipping")
+            continue
+        packs.append(
+            AssetPack(
+                name,
+                option["url"],
+                option.get("branch", "master"),
+                option.get("source", ""),
+                option.get("target", ""),
+            )
+        )
+    return packs
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ["git", *args], check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except subprocess.CalledProcessError as e:
+        raise AssetPackError(f"git {args[0]} failed: {e.stderr.strip()}") from e
+
+
+def remote_commit(url, branch):
+    """The commit a remote branch points to, without fetching anything."""
+    output = _git("ls-remote", url, f"refs/heads/{branch}")
+    if not output:
+        raise AssetPackError(f"{url} has no branch {branch}")
+    return output.split()[0]
+
+
+def _cache_name(url):
+    name = re.sub(
+        r"[^A-Za-z0-9_.-]+", "_", url.rstrip("/").split("/")[-1].removesuffix(".git")
+    )
+    return f"{name}-{hashlib.sha1(url.encode()).hexdigest()[:8]}"
+
+
+def _local_commit(mirror, ref):
+    try:
+        return _git(
+            "-C", mirror, "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"
+        )
+    except AssetPackError:
+        return None
+
+
+def update_mirror(pack, cache_dir=PACK_CACHE_DIR):
+    """
+    Make the local bare mirror of a pack hold the branch's latest commit.
+    Returns (mirror path, commit); nothing is fetched if it's already there.
+    If the remote can't be reached, the commit the mirror already has is used.
+    """
+    mirror = os.path.join(
+        ensure_dir(os.path.join(cache_dir, "mirrors")), _cache_name(pack.url)
+    )
+    ref = f"refs/heads/{pack.branch}"
+    try:
+        commit = remote_commit(pack.url, pack.branch)
+    except AssetPackError as e:
+        commit = _local_commit(mirror, ref) if os.path.isdir(mirror) else None
+        if commit is None:
+            raise
+        print(f"{pack.name}: {e}, using the mirrored {commit[:10]}")
+        return mirror, commit
+
+    if not os.path.isdir(mirror):
+        partial = f"{mirror}.partial"
+        trash.move(partial)
+        _git(
+            "clone",
+            "--bare",
+            "--depth",
+            "1",
+            "--branch",
+            pack.branch,
+            pack.url,
+            partial,
+        )
+        os.rename(partial, mirror)
+    elif _local_commit(mirror, ref) != commit:
+        _git("-C", mirror, "fetch", "--depth", "1", "origin", f"+{ref}:{ref}")
+
+    # Verify the mirror really has what the remote advertised
+    if _local_commit(mirror, ref) != commit:
+        raise AssetPackError(
+            f"{pack.url} {pack.branch} doesn't match the advertised {commit}"
+        )
+    return mirror, commit
+
+
+def _read_marker(tree):
+    try:
+        with open(os.path.join(tree, PACK_MARKER), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _pack_is_complete(tree):
+    marker = _read_marker(tree)
+    if marker is None:
+        return False
+    return marker.get("files") == sum(
+        1 for path in walk_files(tree) if path != PACK_MARKER
+    )
+
+
+def newest_tree(url, cache_dir=PACK_CACHE_DIR):
+    """The most recently used complete tree extracted from a pack URL, or None."""
+    trees_dir = os.path.join(cache_dir, "trees")
+    try:
+        names = os.listdir(trees_dir)
+    except FileNotFoundError:
+        return None
+    trees = []
+    for name in names:
+        tree = os.path.join(trees_dir, name)
+        marker = _read_marker(tree)
+        if marker and marker.get("url") == url and _pack_is_complete(tree):
+            trees.append((os.path.getmtime(tree), tree))
+    return max(trees)[1] if trees else None
+
+
+def extract_pack(mirror, commit, url, cache_dir=PACK_CACHE_DIR):
+    """Check out a commit of a mirror once; later builds reuse the tree. Returns its path."""
+    tree = os.path.join(ensure_dir(os.path.join(cache_dir, "trees")), commit)
+    if os.path.isdir(tree) and _pack_is_complete(tree):
+        os.utime(tree)  # Last use, for the cache budget
+        return tree
+    trash.move(tree)
+
+    partial = f"{tree}.partial"
+    trash.move(partial)
+    os.makedirs(partial)
+    process = subprocess.Popen(
+        ["git", "-C", mirror, "archive", "--format=tar", commit], stdout=subprocess.PIPE
+    )
+    with tarfile.open(fileobj=process.stdout, mode="r|") as archive:
+        if hasattr(tarfile, "data_filter"):
+            archive.extractall(partial, filter="data")
+        else:
+            archive.extractall(partial)
+    if process.wait() != 0:
+        raise AssetPackError(f"git archive of {commit} failed")
+
+    files = sum(1 for _ in walk_files(partial))
+    with open(os.path.join(partial, PACK_MARKER), "w") as file:
+        json.dump({"url": url, "commit": commit, "files": files}, file)
+    os.rename(partial, tree)
+    return tree
+
+
+def prepare_pack(pack):
+    """Fetch (if needed) and extract a pack. Returns the directory to install."""
+    try:
+        mirror, commit = update_mirror(pack)
+        tree = extract_pack(mirror, commit, pack.url)
+    except AssetPackError as e:
+        # Offline and the mirror was evicted: the last tree still works
+        tree = newest_tree(pack.url)
+        if tree is None:
+            raise
+        commit = _read_marker(tree)["commit"]
+        print(f"{pack.name}: {e}, using the cached {commit[:10]}")
+    source = os.path.join(tree, pack.source)
+    if not os.path.isdir(source):
+        raise AssetPackError(f"{pack.name}: {pack.url} has no {pack.source or 'files'}")
+    print(f"{pack.name}: {pack.url} at {commit[:10]}")
+    return source
+
+
+def link_pack(source, res_dir, pack):
+    """Install a prepared pack into a build's res/ directory. Returns the number of files."""
+    target = os.path.join(res_dir, pack.target)
+    pairs = [
+        (os.path.join(source, path), os.path.join(target, path))
+        for path in walk_files(source)
+        if path != PACK_MARKER
+    ]
+    # Reflinked (or copied), never hardlinked: the install moves these files
+    # on, and an installed texture edited in place would change the cache
+    strategies, _ = install_files(pairs, allow_hardlink=False)
+    return sum(strategies.values())
+
+
+class AssetPackFetcher:
+    """Prepares a repo's asset packs in the background while it is cloned and built."""
+
+    def __init__(self, packs):
+        self.packs = packs
+        self.futures = []
+        if packs:
+            executor = ThreadPoolExecutor(max_workers=len(packs))
+            self.futures = [executor.submit(prepare_pack, pack) for pack in packs]
+            executor.shutdown(wait=False)
+
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def results(self):
+        """
+        [(pack, directory to install)] of the packs that could be prepared;
+        blocks until they are, so the GUI only calls it once done().
+        """
+        prepared = []
+        for pack, future in zip(self.packs, self.futures):
+            try:
+                prepared.append((pack, future.result()))
+            except (OSError, AssetPackError, tarfile.TarError) as e:
+                print(f"Error preparing {pack.name}: {e}")
+        return prepared
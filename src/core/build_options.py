@@ -0,0 +1,114 @@
+from collections import namedtuple
+
+CHECKBOX = "checkbox"
+SPINBOX = "spinbox"
+DROPDOWN = "dropdown"
+# Display order of the option groups
+KIND_ORDER = (CHECKBOX, SPINBOX, DROPDOWN)
+# Shown even when advanced options are hidden
+ALWAYS_VISIBLE = {"BUILD_TARGET"}
+
+OptionSpec = namedtuple("OptionSpec", "name kind info advanced")
+
+
+def repo_options(repo):
+    """
+    The options offered for a repo: its make variables plus its
+    special_options (asset packs to install), which are marked ``special``
+    since they aren't passed to make. Packs without a URL to fetch them
+    from aren't offered, the checkbox would do nothing.
+    """
+    options = dict(repo.get("options", {}) or {})
+    special_options = repo.get("info", {}).get("special_options", {}) or {}
+    for name, info in special_options.items():
+        if info.get("url"):
+            options[name] = dict(info, special=True)
+    return options
+
+
+def option_kind(info):
+    """Which widget an option from a repo config is edited with, or None."""
+    values = info.get("values")
+    if isinstance(values, list):
+        if len(values) == 2 and set(values) == {0, 1}:
+            return CHECKBOX
+        return DROPDOWN
+    if isinstance(values, (int, float)):
+        return SPINBOX
+    return None
+
+
+def initial_value(info):
+    """The recommended value if there is one, otherwise the default."""
+    if info.get("recommended") is not None:
+        return info["recommended"]
+    return info.get("default")
+
+
+def _is_offered(value, info):
+    values = info.get("values")
+    if not isinstance(values, list):
+        return True
+    # Dropdowns report their selection as text
+    return str(value) in [str(v) for v in values]
+
+
+class BuildOptionsModel:
+    """
+    The build options of one repo and the values the user picked for them.
+
+    ``selections`` is what gets passed to make; it survives switching to
+    another repo and back, and config reloads keep every choice that is
+    still valid.
+    """
+
+    def __init__(self, repo_name, options):
+        self.repo_name = repo_name
+        self.options = {}
+        self.specs = []
+        self.selections = {}
+        self.update_options(options)
+
+    def update_options(self, options):
+        """Adopt a new set of options. Returns the names of the options that changed."""
+        options = options or {}
+        changed = {
+            name
+            for name in set(self.options) | set(options)
+            if self.options.get(name) != options.get(name)
+        }
+        self.options = dict(options)
+
+        specs = []
+        for name, info in self.options.items():
+            kind = option_kind(info)
+            if kind is not None:
+                specs.append(
+                    OptionSpec(name, kind, info, bool(info.get("advanced", False)))
+                )
+        specs.sort(key=lambda spec: (KIND_ORDER.index(spec.kind), spec.name))
+        self.specs = specs
+
+        for name in list(self.selections):
+            if name not in self.options or not _is_offered(
+                self.selections[name], self.options[name]
+            ):
+                del self.selections[name]
+        for name, info in self.options.items():
+            if name not in self.selections and initial_value(info) is not None:
+                self.selections[name] = initial_value(info)
+        return changed
+
+    def visible_specs(self, show_advanced):
+        return [
+            spec
+            for spec in self.specs
+            if show_advanced or not spec.advanced or spec.name in ALWAYS_VISIBLE
+        ]
+
+    def value(self, name):
+        value = self.selections.get(name)
+        if value is None:
+            values = self.options.get(name, {}).get("values")
+            value = values[0] if isinstance(values, list) and values else 0
+        return value
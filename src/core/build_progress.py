@@ -0,0 +1,156 @@
+import json
+import os
+import re
+import shlex
+import statistics
+import time
+
+from core.ansi import strip_ansi
+from core.paths import DATA_DIR, ensure_dir
+
+HISTORY_PATH = os.path.join(DATA_DIR, "build_history.json")
+HISTORY_DURATIONS = 5
+EXPECTED_OBJECTS_MARKER = "64ALL_EXPECTED_OBJECTS="
+
+# "cc ... -o build/us_pc/src/game/foo.o" or the pretty-printed "Compiling: foo.c -> build/.../foo.o"
+_OBJECT_PATTERN = re.compile(r"(?:\s-o\s+|\s->\s+)(\S+\.o)\b")
+
+
+def load_history(history_path=HISTORY_PATH):
+    """Load per-repo build statistics from previous builds."""
+    try:
+        with open(history_path, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Error reading build history: {e}")
+        return {}
+
+
+def save_history(history, history_path=HISTORY_PATH):
+    ensure_dir(os.path.dirname(history_path))
+    temp_path = f"{history_path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(history, file, indent=2)
+    os.replace(temp_path, history_path)
+
+
+def with_object_count(make_command, make_args):
+    """
+    Wrap a make command so it first prints how many objects it will compile.
+
+    The count comes from a ``make -n`` dry run (one per variant if
+    ``make_args`` is a list, summed) and is printed as
+    ``64ALL_EXPECTED_OBJECTS=<n>``. The result is a single ``sh -c`` command so
+    that it runs entirely inside the build container.
+    """
+    if isinstance(make_args, str):
+        make_args = [make_args]
+    dry_runs = [
+        f"$(make -n {args} 2>/dev/null "
+        "| grep -oE -- '-o +[^ ]+\\.o\\b' | sort -u | wc -l)"
+        for args in make_args
+    ]
+    script = (
+        f'echo "{EXPECTED_OBJECTS_MARKER}$(( {" + ".join(dry_runs)} ))"; {make_command}'
+    )
+    return f"sh -c {shlex.quote(script)}"
+
+
+class CompileProgressEstimator:
+    """
+    Estimate compile progress and time left from streaming make output.
+
+    Progress is the number of distinct object files seen so far against the
+    expected total, which comes from the previous build of the same repo or
+    from a dry-run count printed ahead of the build. The ETA blends the
+    current compile rate with the historical duration of the repo's builds.
+    """
+
+    def __init__(self, repo_name, history=None):
+        self.repo_name = repo_name
+        entry = (load_history() if history is None else history).get(repo_name, {})
+        self.expected_objects = entry.get("objects") or None
+        durations = entry.get("durations", [])
+        self.expected_duration = statistics.median(durations) if durations else None
+
+        self.objects = set()
+        self.started = time.monotonic()
+        self.first_object_time = None
+
+    def feed(self, line):
+        """Process one line of build output. Returns True if progress changed."""
+        line = strip_ansi(line)
+        if line.startswith(EXPECTED_OBJECTS_MARKER):
+            try:
+                expected = int(line[len(EXPECTED_OBJECTS_MARKER) :].strip())
+            except ValueError:
+                return False
+            if expected > 0:
+                self.expected_objects = expected
+                return True
+            return False
+
+        match = _OBJECT_PATTERN.search(line)
+        if not match or match.group(1) in self.objects:
+            return False
+        if self.first_object_time is None:
+            self.first_object_time = time.monotonic()
+        self.objects.add(match.group(1))
+        return True
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def fraction(self):
+        """Fraction of the build done, or None if there is nothing to go on."""
+        if self.expected_objects:
+            return min(len(self.objects) / self.expected_objects, 0.99)
+        if self.expected_duration:
+            return min(self.elapsed() / self.expected_duration, 0.99)
+        return None
+
+    def eta_seconds(self):
+        """Estimated seconds left, or None if unknown."""
+        history_eta = None
+        if self.expected_duration:
+            history_eta = max(self.expected_duration - self.elapsed(), 0.0)
+
+        rate_eta = None
+        compiled = len(self.objects)
+        if self.expected_objects and compiled >= 5 and self.first_object_time:
+            compile_time = time.monotonic() - self.first_object_time
+            if compile_time > 0:
+                remaining = max(self.expected_objects - compiled, 0)
+                rate_eta = remaining * compile_time / (compiled - 1)
+
+        if rate_eta is None:
+            return history_eta
+        if history_eta is None:
+            return rate_eta
+        # Trust the measured rate more as the build progresses
+        weight = self.fraction()
+        return weight * rate_eta + (1 - weight) * history_eta
+
+    def record(self, history_path=HISTORY_PATH):
+        """Store this (successful) build's object count and duration."""
+        history = load_history(history_path)
+        entry = history.setdefault(self.repo_name, {})
+        if self.objects:
+            entry["objects"] = len(self.objects)
+        entry["durations"] = (entry.get("durations", []) + [round(self.elapsed(), 1)])[
+            -HISTORY_DURATIONS:
+        ]
+        save_history(history, history_path)
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
@@ -0,0 +1,187 @@
+import gzip
+import json
+import os
+import re
+import time
+from bisect import bisect_right
+from collections import namedtuple
+
+from core.ansi import strip_ansi
+from core.paths import DATA_DIR, ensure_dir
+
+LOG_DIR = os.path.join(DATA_DIR, "logs")
+# Lines per gzip member; each member can be decompressed on its own
+MEMBER_LINES = 512
+# Lines containing these words (case-insensitive) are indexed by line number
+INDEXED_TERMS = ("error", "warning")
+
+LogMatch = namedtuple("LogMatch", "build_id repo line_number text")
+
+
+class BuildLog:
+    """
+    Persistent log of a single build job.
+
+    The log is written as a series of independently compressed gzip members
+    (the file as a whole is still a normal .gz readable by ``zcat``). A JSON
+    sidecar records where each member starts and on which lines the indexed
+    terms occur, so searches only decompress the members that can match.
+    """
+
+    def __init__(self, repo_name, log_dir=LOG_DIR):
+        ensure_dir(log_dir)
+        self.repo_name = repo_name
+        self.started = time.time()
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", repo_name) or "build"
+        build_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}"
+        suffix = 1
+        self.build_id = build_id
+        while True:
+            self.path = os.path.join(log_dir, f"{self.build_id}.log.gz")
+            try:
+                self.file = open(self.path, "xb")
+                break
+            except FileExistsError:
+                suffix += 1
+                self.build_id = f"{build_id}-{suffix}"
+        self.index_path = os.path.join(log_dir, f"{self.build_id}.idx.json")
+
+        self.line_count = 0
+        self.members = []
+        self.terms = {term: [] for term in INDEXED_TERMS}
+        self.pending_lines = []
+
+    def write_line(self, line):
+        """Append one line of output; ANSI escapes are stripped."""
+        if self.file is None:
+            return
+        line = strip_ansi(line)
+        lowered = line.lower()
+        for term in INDEXED_TERMS:
+            if term in lowered:
+                self.terms[term].append(self.line_count)
+
+        self.pending_lines.append(line)
+        self.line_count += 1
+        if len(self.pending_lines) >= MEMBER_LINES:
+            self._write_member()
+
+    def _write_member(self):
+        if not self.pending_lines:
+            return
+        data = gzip.compress(
+            ("\n".join(self.pending_lines) + "\n").encode("utf-8", "replace")
+        )
+        first_line = self.line_count - len(self.pending_lines)
+        self.members.append([first_line, self.file.tell(), len(data)])
+        self.file.write(data)
+        self.pending_lines = []
+
+    def close(self, status):
+        """Flush the remaining lines and write the index."""
+        if self.file is None:
+            return
+        self._write_member()
+        self.file.close()
+        self.file = None
+
+        index = {
+            "build_id": self.build_id,
+            "repo": self.repo_name,
+            "status": status,
+            "started": self.started,
+            "finished": time.time(),
+            "line_count": self.line_count,
+            "log": os.path.basename(self.path),
+            "members": self.members,
+            "terms": self.terms,
+        }
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(index, file)
+        os.replace(temp_path, self.index_path)
+        print(f"Build log saved to {self.path}")
+
+
+def list_logs(log_dir=LOG_DIR, repo=None):
+    """Return the indexes of all finished build logs, newest first."""
+    if not os.path.isdir(log_dir):
+        return []
+
+    indexes = []
+    for filename in os.listdir(log_dir):
+        if not filename.endswith(".idx.json"):
+            continue
+        try:
+            with open(os.path.join(log_dir, filename), "r") as file:
+                index = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable log index {filename}: {e}")
+            continue
+        if repo is None or index.get("repo") == repo:
+            indexes.append(index)
+    indexes.sort(key=lambda index: index.get("started", 0), reverse=True)
+    return indexes
+
+
+def _read_member(file, member):
+    first_line, offset, length = member
+    file.seek(offset)
+    text = gzip.decompress(file.read(length)).decode("utf-8", "replace")
+    return first_line, text.split("\n")[:-1]
+
+
+def search_logs(pattern, log_dir=LOG_DIR, repo=None, limit=200):
+    """
+    Case-insensitive substring search over past build logs, newest first.
+
+    If the pattern contains an indexed term (e.g. "error:"), only the lines
+    recorded for that term are considered and only their gzip members are
+    decompressed; other patterns fall back to scanning every member.
+    """
+    needle = pattern.lower()
+    indexed_terms = [term for term in INDEXED_TERMS if term in needle]
+    matches = []
+
+    for index in list_logs(log_dir, repo):
+        members = index["members"]
+        candidate_lines = None
+        if indexed_terms:
+            candidate_lines = min(
+                (index["terms"].get(term, []) for term in indexed_terms), key=len
+            )
+            if not candidate_lines:
+                continue
+            member_starts = [member[0] for member in members]
+            wanted = sorted(
+                {bisect_right(member_starts, line) - 1 for line in candidate_lines}
+            )
+            members = [members[i] for i in wanted]
+            candidate_lines = set(candidate_lines)
+
+        log_path = os.path.join(log_dir, index["log"])
+        try:
+            with open(log_path, "rb") as file:
+                for member in members:
+                    first_line, lines = _read_member(file, member)
+                    for line_number, line in enumerate(lines, first_line):
+                        if (
+                            candidate_lines is not None
+                            and line_number not in candidate_lines
+                        ):
+                            continue
+                        if needle in line.lower():
+                            matches.append(
+                                LogMatch(
+                                    index["build_id"],
+                                    index["repo"],
+                                    line_number + 1,
+                                    line,
+                                )
+                            )
+                            if len(matches) >= limit:
+                                return matches
+        except OSError as e:
+            print(f"Error reading build log {log_path}: {e}")
+
+    return matches
@@ -1,4 +1,6 @@
+import glob
 import os
+import shlex
 
 
 def symlink_file_to_dir(file_path: str, dir_path: str, link_name: str):
@@ -20,3 +22,70 @@ def symlink_file_to_dir(file_path: str, dir_path: str, link_name: str):
         print(f"Symlink created: {link_path} -> {file_path}")
     except OSError as e:
         print(f"Error creating symlink: {e}")
+
+
+def variant_make_args(region, make_args):
+    """make arguments of one region's build; the decomp selects the ROM with VERSION."""
+    return f"VERSION={region} {make_args}".strip()
+
+
+def region_build_command(regions, make_args):
+    """
+    The command building every region in one clone.
+
+    A single region is a plain parallel make. For several regions the
+    Makefile's own setup (building tools/ and running extract_assets.py
+    while parsing it) is done once up front, since concurrent makes would
+    race on the shared files: tools first, which the extractor needs, then
+    the assets of every region in one go, stopping on failure. The makes
+    then build side by side with extraction turned off (NOEXTRACT=1; tools
+    are already up to date), splitting the cores between them. Fails if
+    any variant fails.
+    """
+    if len(regions) == 1:
+        return f"make -j$(nproc) {variant_make_args(regions[0], make_args)}"
+
+    lines = [
+        "if [ -d tools ]; then make -C tools >&2 || exit 1; fi",
+        f"if [ -x ./extract_assets.py ]; then ./extract_assets.py {' '.join(regions)} >&2 || exit 1; fi",
+        f"jobs=$(( ($(nproc) + {len(regions) - 1}) / {len(regions)} ))",
+    ]
+    for index, region in enumerate(regions):
+        lines.append(
+            f"make -j$jobs NOEXTRACT=1 {variant_make_args(region, make_args)} & pid{index}=$!"
+        )
+    lines.append("status=0")
+    lines.extend(f"wait $pid{index} || status=1" for index in range(len(regions)))
+    lines.append("exit $status")
+    return f"sh -c {shlex.quote('; '.join(lines))}"
+
+
+def with_ccache(command, ccache_dir, max_size_mb):
+    """
+    Run a build with its C compilers behind ccache, sharing one cache
+    directory that ccache keeps within ``max_size_mb``.
+    """
+    return (
+        f"env CCACHE_DIR={shlex.quote(ccache_dir)} CCACHE_MAXSIZE={int(max_size_mb)}M "
+        f"{command}"
+    )
+
+
+def ccache_make_args():
+    return " ".join(shlex.quote(arg) for arg in ("CC=ccache gcc", "CXX=ccache g++"))
+
+
+def find_build_dir(workspace, region):
+    """
+    The output directory of a region's build: build/<region>_pc for the PC
+    ports, build/<region>_<target> in general (the newest if several).
+    """
+    default = os.path.join(workspace, "build", f"{region}_pc")
+    if os.path.isdir(default):
+        return default
+    candidates = [
+        path
+        for path in glob.glob(os.path.join(workspace, "build", f"{region}_*"))
+        if os.path.isdir(path)
+    ]
+    return max(candidates, key=os.path.getmtime) if candidates else None
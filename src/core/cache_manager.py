@@ -0,0 +1,351 @@
+import fcntl
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+from core.paths import CACHE_DIR, ensure_dir
+from core.settings import get_setting
+from core.trash import _lower_priority, trash
+
+# When entries were last used, for caches whose file times don't tell
+ACCESS_PATH = os.path.join(CACHE_DIR, "cache_access.json")
+# Locked shared by every running build, of any 64All process; see BuildLock
+BUILD_LOCK_PATH = os.path.join(CACHE_DIR, "build.lock")
+
+LOGS = "logs"
+THUMBNAILS = "thumbnails"
+ROMS = "roms"
+METADATA = "metadata"
+CCACHE = "ccache"
+ASSETS = "assets"
+PACKS = "packs"
+IMAGES = "images"
+
+CCACHE_DIR = os.path.join(CACHE_DIR, "ccache")
+# ccache trims itself file by file to its max size, which is this share of
+# the budget (its own default of 5 GB would be more than all of it)
+CCACHE_BUDGET_SHARE = 0.25
+# The image DistroboxManager creates its containers from
+CONTAINER_IMAGES = ("ubuntu:latest",)
+
+CacheEntry = namedtuple("CacheEntry", "cache key size last_access paths")
+
+
+def _tree_usage(path):
+    """(bytes used, newest access or modification time) of a file or tree."""
+    try:
+        stat_result = os.lstat(path)
+    except FileNotFoundError:
+        return 0, 0
+    size = stat_result.st_blocks * 512
+    last_access = max(stat_result.st_atime, stat_result.st_mtime)
+    if os.path.isdir(path) and not os.path.islink(path):
+        for directory, _, filenames in os.walk(path):
+            for name in filenames:
+                try:
+                    stat_result = os.lstat(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+                size += stat_result.st_blocks * 512
+                last_access = max(
+                    last_access, stat_result.st_atime, stat_result.st_mtime
+                )
+    return size, last_access
+
+
+def _directory_entries(cache, directory, group=None):
+    """One entry per item of a directory, or per ``group(name)`` of items."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    groups = {}
+    for name in names:
+        if name.endswith(".tmp"):
+            continue
+        key = group(name) if group else name
+        groups.setdefault(key, []).append(os.path.join(directory, name))
+    entries = []
+    for key, paths in groups.items():
+        usages = [_tree_usage(path) for path in paths]
+        entries.append(
+            CacheEntry(
+                cache,
+                key,
+                sum(size for size, _ in usages),
+                max(last_access for _, last_access in usages),
+                tuple(paths),
+            )
+        )
+    return entries
+
+
+def _log_entries():
+    from core.buildlog import LOG_DIR
+
+    # A build's .log.gz and .idx.json go together
+    return _directory_entries(LOGS, LOG_DIR, group=lambda name: name.split(".", 1)[0])
+
+
+def _thumbnail_entries():
+    # ui.thumbnails.THUMBNAIL_DIR; not imported since that pulls in Qt
+    return _directory_entries(THUMBNAILS, os.path.join(CACHE_DIR, "thumbnails"))
+
+
+def _rom_entries():
+    from core.romformat import ROM_STORE_DIR
+
+    return _directory_entries(ROMS, ROM_STORE_DIR)
+
+
+def _metadata_entries():
+    from core.repo_registry import SNAPSHOT_PATH
+
+    # core.dependency_utils.PACKAGE_QUERY_CACHE_PATH; that module imports Qt too
+    package_query_path = os.path.join(CACHE_DIR, "package_query.json")
+    entries = []
+    for path in (SNAPSHOT_PATH, package_query_path):
+        if os.path.exists(path):
+            size, last_access = _tree_usage(path)
+            entries.append(
+                CacheEntry(METADATA, os.path.basename(path), size, last_access, (path,))
+            )
+    return entries
+
+
+def _asset_entries():
+    from core.asset_cache import ASSET_CACHE_DIR
+
+    entries = _directory_entries(ASSETS, ASSET_CACHE_DIR)
+    return [entry for entry in entries if not entry.key.endswith(".partial")]
+
+
+def _pack_entries():
+    from core.asset_packs import PACK_CACHE_DIR
+
+    # Mirrors and extracted trees are evicted separately; either is rebuilt
+    entries = []
+    for kind in ("mirrors", "trees"):
+        entries.extend(
+            entry
+            for entry in _directory_entries(PACKS, os.path.join(PACK_CACHE_DIR, kind))
+            if not entry.key.endswith(".partial")
+        )
+    return entries
+
+
+def ccache_max_size_mb(budget_mb=None):
+    if budget_mb is None:
+        budget_mb = get_setting("cache_budget_mb")
+    return max(1, int(budget_mb * CCACHE_BUDGET_SHARE))
+
+
+def _ccache_entries():
+    # Counted against the budget, but never evicted: see _trim_ccache
+    if not os.path.isdir(CCACHE_DIR):
+        return []
+    size, last_access = _tree_usage(CCACHE_DIR)
+    return [CacheEntry(CCACHE, "ccache", size, last_access, (CCACHE_DIR,))]
+
+
+def _trim_ccache(max_size_mb):
+    """
+    Shrink the ccache to its share of the budget now, e.g. after the budget
+    was lowered. Builds pass the same limit (see buildlogic.with_ccache), so
+    the container's ccache trims itself too; this needs ccache on the host.
+    """
+    if shutil.which("ccache") is None or not os.path.isdir(CCACHE_DIR):
+        return
+    # --max-size is also saved in the cache's ccache.conf
+    subprocess.run(
+        ["ccache", "--max-size", f"{max_size_mb}M", "--cleanup"],
+        env={**os.environ, "CCACHE_DIR": CCACHE_DIR},
+        capture_output=True,
+    )
+
+
+def _image_entries(access_times):
+    if shutil.which("podman") is None:
+        return []
+    entries = []
+    for image in CONTAINER_IMAGES:
+        process = subprocess.run(
+            ["podman", "image", "inspect", "--format", "{{.Size}}", image],
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode != 0:
+            continue  # Not pulled
+        last_access = access_times.get(f"{IMAGES}:{image}", 0)
+        entries.append(
+            CacheEntry(IMAGES, image, int(process.stdout.strip() or 0), last_access, ())
+        )
+    return entries
+
+
+class BuildLock:
+    """
+    Held while a build runs, from the clone to the install. gc only evicts
+    an entry while it can lock the file exclusively, so it never removes
+    the ROM, packs or container image of a build in progress, in this or
+    another 64All process.
+    """
+
+    def __init__(self, path=BUILD_LOCK_PATH):
+        self.path = path
+        self.file = None
+
+    def acquire(self):
+        if self.file is not None:
+            return
+        ensure_dir(os.path.dirname(self.path))
+        self.file = open(self.path, "a")
+        # Waits at most for the one entry gc may be evicting
+        fcntl.flock(self.file, fcntl.LOCK_SH)
+
+    def release(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class CacheManager:
+    """
+    Keeps everything 64All caches within one disk budget.
+
+    Each cache class lists its entries with their size and last use; ``gc``
+    evicts the least recently used entries across all classes until the
+    total fits. Everything evicted is recreated on demand (a rebuild, a
+    rescan, a new pull), just slower.
+    """
+
+    def __init__(self, access_path=ACCESS_PATH):
+        self.access_path = access_path
+        self.sources = {
+            LOGS: _log_entries,
+            THUMBNAILS: _thumbnail_entries,
+            ROMS: _rom_entries,
+            METADATA: _metadata_entries,
+            CCACHE: _ccache_entries,
+            ASSETS: _asset_entries,
+            PACKS: _pack_entries,
+            IMAGES: lambda: _image_entries(self._read_access_times()),
+        }
+
+    def record_access(self, cache, key):
+        """Note a use of an entry whose file times aren't updated by using it."""
+        access_times = self._read_access_times()
+        access_times[f"{cache}:{key}"] = time.time()
+        try:
+            ensure_dir(os.path.dirname(self.access_path))
+            temp_path = f"{self.access_path}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump(access_times, file)
+            os.replace(temp_path, self.access_path)
+        except OSError as e:
+            print(f"Error writing {self.access_path}: {e}")
+
+    def entries(self):
+        entries = []
+        for cache, source in self.sources.items():
+            try:
+                entries.extend(source())
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"Error scanning the {cache} cache: {e}")
+        return entries
+
+    def stats(self, entries=None):
+        """{cache: (entry count, bytes, oldest last access)}"""
+        stats = {cache: (0, 0, None) for cache in self.sources}
+        for entry in self.entries() if entries is None else entries:
+            count, size, oldest = stats[entry.cache]
+            oldest = (
+                entry.last_access if oldest is None else min(oldest, entry.last_access)
+            )
+            stats[entry.cache] = (count + 1, size + entry.size, oldest)
+        return stats
+
+    def gc(self, budget_bytes=None, dry_run=False):
+        """Evict least recently used entries until the caches fit the budget. Returns the evicted entries."""
+        if budget_bytes is None:
+            budget_bytes = get_setting("cache_budget_mb") * 1024 * 1024
+        if not dry_run:
+            try:
+                _trim_ccache(ccache_max_size_mb(budget_bytes // (1024 * 1024)))
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"Error trimming the ccache: {e}")
+        entries = sorted(self.entries(), key=lambda entry: entry.last_access)
+        total = sum(entry.size for entry in entries)
+        evicted = []
+        ensure_dir(os.path.dirname(BUILD_LOCK_PATH))
+        with open(BUILD_LOCK_PATH, "a") as lock_file:
+            for entry in entries:
+                if total <= budget_bytes:
+                    break
+                if entry.cache == CCACHE:
+                    # Emptying it would cost a full rebuild; it keeps to its share
+                    continue
+                if not dry_run:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        print("A build is running, not evicting any more cache entries")
+                        break
+                    try:
+                        self.evict(entry)
+                    except (OSError, subprocess.SubprocessError) as e:
+                        print(f"Error evicting {entry.cache}/{entry.key}: {e}")
+                        continue
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+                total -= entry.size
+                evicted.append(entry)
+        return evicted
+
+    def evict(self, entry):
+        if entry.cache == IMAGES:
+            # Without -f: an image a container still uses fails and is skipped
+            process = subprocess.run(
+                ["podman", "rmi", entry.key], capture_output=True, text=True
+            )
+            if process.returncode != 0:
+                raise OSError(process.stderr.strip())
+            return
+        for path in entry.paths:
+            if os.path.isdir(path) and not os.path.islink(path):
+                trash.move(path)
+            elif os.path.lexists(path):
+                os.unlink(path)
+
+    def _read_access_times(self):
+        try:
+            with open(self.access_path, "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Error reading {self.access_path}: {e}")
+            return {}
+
+
+cache_manager = CacheManager()
+
+
+def start_background_gc():
+    """
+    Bring the caches within budget and drop unused store objects on a
+    low-priority thread, so neither startup nor quitting waits for it.
+    """
+    from core.store import store
+
+    def run():
+        _lower_priority()
+        cache_manager.gc()
+        # Objects of generations pruned in an earlier session
+        store.gc()
+
+    threading.Thread(target=run, name="cache-gc", daemon=True).start()
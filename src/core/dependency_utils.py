@@ -1,38 +1,69 @@
+import json
+import os
 import shutil
 import subprocess
 import sys
 
-import distro
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QApplication, QMessageBox, QProgressDialog
 
+from core.paths import CACHE_DIR, ensure_dir
+
+PACKAGE_QUERY_CACHE_PATH = os.path.join(CACHE_DIR, "package_query.json")
+
+# Files or directories whose mtime changes whenever packages are installed or removed
+PACKAGE_DATABASES = {
+    "apt": ["/var/lib/dpkg/status"],
+    "dnf": [
+        "/usr/lib/sysimage/rpm/rpmdb.sqlite",
+        "/var/lib/rpm/rpmdb.sqlite",
+        "/var/lib/rpm/Packages",
+    ],
+    "zypper": [
+        "/usr/lib/sysimage/rpm/Packages.db",
+        "/usr/lib/sysimage/rpm/rpmdb.sqlite",
+        "/var/lib/rpm/Packages.db",
+        "/var/lib/rpm/Packages",
+    ],
+    "pacman": ["/var/lib/pacman/local"],
+}
+
 
 def get_required_packages():
     """Get the required packages and binaries based on the operating system."""
     return {
         "apt": {
-            "packages": ["libsdl2-dev", "libglew-dev", "hexdump", "python3"],
+            "packages": ["libsdl2-dev", "libglew-dev", "hexdump", "python3", "podman"],
             "binaries": {
-                "hexdump": "hexdump"
+                "hexdump": "hexdump",
+                "podman": "podman",
             },  # Key: binary, Value: package containing the binary
         },
         "dnf": {
-            "packages": ["SDL2-devel", "glew-devel", "hexdump", "python3"],
-            "binaries": {"hexdump": "hexdump"},
+            "packages": ["SDL2-devel", "glew-devel", "hexdump", "python3", "podman"],
+            "binaries": {"hexdump": "hexdump", "podman": "podman"},
         },
         "zypper": {
-            "packages": ["libSDL2-devel", "libGLEW-devel", "hexdump", "python3"],
-            "binaries": {"hexdump": "hexdump"},
+            "packages": [
+                "libSDL2-devel",
+                "libGLEW-devel",
+                "hexdump",
+                "python3",
+                "podman",
+            ],
+            "binaries": {"hexdump": "hexdump", "podman": "podman"},
         },
         "pacman": {
-            "packages": ["sdl2", "glew", "hexdump", "python"],
-            "binaries": {"hexdump": "hexdump"},
+            "packages": ["sdl2", "glew", "hexdump", "python", "podman"],
+            "binaries": {"hexdump": "hexdump", "podman": "podman"},
         },
     }
 
 
 def detect_package_manager():
     """Detect the package manager used by the system."""
+    import distro
+
     dist = distro.id()
     if dist in ["ubuntu", "debian"]:
         return "apt"
@@ -47,41 +78,110 @@ def detect_package_manager():
         return None
 
 
-def is_package_installed(package_manager, package):
-    """Check if a package is installed using the system's package manager."""
-    try:
-        if package_manager == "apt":
-            result = subprocess.run(
-                ["dpkg", "-l", package], stdout=subprocess.PIPE, text=True
-            )
-        elif package_manager == "dnf" or package_manager == "zypper":
-            result = subprocess.run(
-                ["rpm", "-q", package], stdout=subprocess.PIPE, text=True
-            )
-        elif package_manager == "pacman":
-            result = subprocess.run(
-                ["pacman", "-Qi", package], stdout=subprocess.PIPE, text=True
+def package_database_mtime(package_manager):
+    """mtime_ns of the package database, or None if it can't be found."""
+    for path in PACKAGE_DATABASES.get(package_manager, []):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+    return None
+
+
+def _run_package_query(package_manager, packages):
+    """Return the subset of ``packages`` that is installed, with one subprocess."""
+    if package_manager == "apt":
+        cmd = ["dpkg-query", "-W", "-f=${Package} ${db:Status-Status}\n"] + packages
+    elif package_manager in ("dnf", "zypper"):
+        cmd = ["rpm", "-q", "--qf", "%{NAME} installed\n"] + packages
+    elif package_manager == "pacman":
+        cmd = ["pacman", "-Q"] + packages
+    else:
+        return set()
+
+    # These exit non-zero when any package is missing but still list the others
+    result = subprocess.run(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    installed = set()
+    for line in result.stdout.splitlines():
+        fields = line.split()
+        if len(fields) != 2 or fields[0] not in packages:
+            continue  # e.g. rpm's "package foo is not installed"
+        if package_manager == "apt" and fields[1] != "installed":
+            continue  # removed but not purged
+        installed.add(fields[0])
+    return installed
+
+
+class PackageQueryCache:
+    """
+    Installed/missing state of packages, valid while the package database is unchanged.
+
+    The cache is dropped as soon as the database mtime moves, e.g. after any
+    install or removal, so it never reports stale results.
+    """
+
+    def __init__(self, cache_path=PACKAGE_QUERY_CACHE_PATH):
+        self.cache_path = cache_path
+        try:
+            with open(cache_path, "r") as file:
+                self.data = json.load(file)
+        except FileNotFoundError:
+            self.data = {}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable package query cache {cache_path}: {e}")
+            self.data = {}
+
+    def installed_packages(self, package_manager, packages):
+        db_mtime = package_database_mtime(package_manager)
+        if (
+            db_mtime is None
+            or self.data.get("package_manager") != package_manager
+            or self.data.get("db_mtime_ns") != db_mtime
+        ):
+            self.data = {
+                "package_manager": package_manager,
+                "db_mtime_ns": db_mtime,
+                "packages": {},
+            }
+
+        known = self.data["packages"]
+        unknown = [package for package in packages if package not in known]
+        if unknown:
+            installed = _run_package_query(package_manager, unknown)
+            known.update((package, package in installed) for package in unknown)
+            if db_mtime is not None:
+                self.save()
+
+        for package in packages:
+            print(
+                f"Package '{package}' is {'installed' if known[package] else 'not installed'}."
             )
-        else:
-            return False
+        return {package for package in packages if known[package]}
 
-        installed = result.returncode == 0
-        print(
-            f"Package '{package}' is {'installed' if installed else 'not installed'}."
-        )
-        return installed
-    except subprocess.CalledProcessError:
-        print(f"Package '{package}' is not installed due to an error.")
-        return False
+    def save(self):
+        try:
+            ensure_dir(os.path.dirname(self.cache_path))
+            temp_path = f"{self.cache_path}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump(self.data, file)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"Error saving package query cache: {e}")
+
+
+def is_package_installed(package_manager, package):
+    """Check if a package is installed using the system's package manager."""
+    return package in PackageQueryCache().installed_packages(package_manager, [package])
 
 
 def find_missing_packages_and_binaries(required, package_manager):
     """Find which required packages and binaries are missing."""
-    missing_packages = [
-        pkg
-        for pkg in required["packages"]
-        if not is_package_installed(package_manager, pkg)
-    ]
+    installed = PackageQueryCache().installed_packages(
+        package_manager, required["packages"]
+    )
+    missing_packages = [pkg for pkg in required["packages"] if pkg not in installed]
 
     for binary, package in required["binaries"].items():
         if shutil.which(binary) is not None:
@@ -196,7 +296,12 @@ def install_packages(packages, package_manager=None):
 
 
 def check_and_install():
-    """Main function to run the package check and install process."""
+    """
+    Main function to run the package check and install process.
+
+    Everything that is missing is installed in a single elevated transaction.
+    Returns True if all required packages are present afterwards.
+    """
     try:
         package_manager = detect_package_manager()
         if not package_manager:
@@ -204,40 +309,47 @@ def check_and_install():
                 "Could not verify required packages. You may not be able to build."
             )
             print("No package manager detected. Exiting.")
-            return
+            return False
 
         print(f"Detected package manager: {package_manager}")
 
         required = get_required_packages().get(package_manager, {})
-        missing_packages = find_missing_packages_and_binaries(required, package_manager)
         if not required:
             print(
                 f"No required packages mapping for package manager: {package_manager}"
             )
-            return
+            return False
+        missing_packages = find_missing_packages_and_binaries(required, package_manager)
 
         if missing_packages:
             print(f"Missing packages detected: {missing_packages}")
 
             # Confirm installation
-            if confirm_installation(missing_packages):
-                install_packages(missing_packages, package_manager)
-                if missing_packages:
-                    show_message_box(
-                        "Installation failed or user cancelled. You will not be able to build."
-                    )
-            else:
+            if not confirm_installation(missing_packages):
                 show_message_box(
                     "Installation cancelled by user. You will not be able to build."
                 )
+                return False
+            installed = False
+            try:
+                installed = install_packages(missing_packages, package_manager)
+            except subprocess.CalledProcessError as e:
+                print(f"Package installation failed: {e}")
+            if not installed:
+                show_message_box(
+                    "Installation failed or user cancelled. You will not be able to build."
+                )
+                return False
 
         else:
             print("All required packages are installed.")
 
         print("check_and_install finished successfully.")
+        return True
     except Exception as e:
         show_message_box(f"An error occurred: {e}", error=True)
         print(f"An error occurred during check_and_install: {e}")
+        return False
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+import re
+from collections import namedtuple
+
+from core.ansi import strip_ansi
+
+Diagnostic = namedtuple("Diagnostic", "file line message")
+
+# gcc/clang: "src/game/foo.c:12:5: error: 'x' undeclared" (also "fatal error:")
+_COMPILER_ERROR = re.compile(
+    r"^(?P<file>[^\s:][^:]*):(?P<line>\d+):(?:\d+:)?\s*(?:fatal )?error:\s*(?P<message>.*)$"
+)
+# ld: "foo.c:(.text+0x1a): undefined reference to `bar'"
+_UNDEFINED_REFERENCE = re.compile(
+    r"^(?P<file>[^\s:][^:]*):(?:(?P<line>\d+)|\([^)]*\)):\s*(?P<message>undefined reference to .*)$"
+)
+# "/usr/bin/ld: cannot find -lGLEW", "collect2: error: ld returned 1 exit status";
+# not the informational ones like "ld: skipping incompatible libGL.so"
+_LINKER_ERROR = re.compile(
+    r"^(?:\S*/)?(?:ld(?:\.\w+)?|collect2):\s*"
+    r"(?P<message>.*(?:cannot find|error:|returned \d+ exit status|undefined reference).*)$"
+)
+# "make: *** [Makefile:612: build/us_pc/src/game/foo.o] Error 1"
+_MAKE_ERROR = re.compile(r"^make(?:\[\d+\])?: \*\*\* (?P<message>.*Error \d+.*)$")
+
+
+def parse_diagnostic(line):
+    """Return a Diagnostic if the line reports a fatal compiler, linker or make error."""
+    line = strip_ansi(line).strip()
+
+    match = _COMPILER_ERROR.match(line) or _UNDEFINED_REFERENCE.match(line)
+    if match:
+        line_number = match.group("line")
+        return Diagnostic(
+            match.group("file"),
+            int(line_number) if line_number else None,
+            match.group("message"),
+        )
+
+    match = _LINKER_ERROR.match(line)
+    if match:
+        return Diagnostic(None, None, line)
+
+    match = _MAKE_ERROR.match(line)
+    if match:
+        return Diagnostic(None, None, line)
+
+    return None
+
+
+def format_diagnostic(diagnostic):
+    if diagnostic.file and diagnostic.line:
+        return f"{diagnostic.file}:{diagnostic.line}: {diagnostic.message}"
+    if diagnostic.file:
+        return f"{diagnostic.file}: {diagnostic.message}"
+    return diagnostic.message
+
+
+class FailureDetector:
+    """Collect fatal diagnostics from streaming build output."""
+
+    MAX_DIAGNOSTICS = 50
+
+    def __init__(self):
+        self.diagnostics = []
+        self.failed = False
+
+    def feed(self, line):
+        """Process one line of output. Returns True on the first fatal error only."""
+        diagnostic = parse_diagnostic(line)
+        if diagnostic is None:
+            return False
+
+        if (
+            diagnostic not in self.diagnostics
+            and len(self.diagnostics) < self.MAX_DIAGNOSTICS
+        ):
+            self.diagnostics.append(diagnostic)
+
+        first_failure = not self.failed
+        self.failed = True
+        return first_failure
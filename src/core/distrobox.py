@@ -1,13 +1,14 @@
 import asyncio
 import os
 import shutil
+import signal
 import subprocess
 import sys
 
 from PyQt6.QtCore import QThread, pyqtSignal, QObject, QEventLoop, pyqtSlot
 from PyQt6.QtWidgets import QApplication, QTextEdit
 
-from core.dependency_utils import install_packages
+from core.dependency_utils import check_and_install
 from ui.ui_setup import UISetup
 
 
@@ -31,6 +32,8 @@ class Worker(QThread):
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
             cwd=self.directory,
+            # Own process group, so terminate_process() reaches every child
+            start_new_session=True,
         )
 
         async def stream_output(stream):
@@ -47,6 +50,15 @@ class Worker(QThread):
         self.return_code = await self.process.wait()
         self.finished_signal.emit(self.return_code)
 
+    def terminate_process(self):
+        """Send SIGTERM to the command and everything it started."""
+        if self.process is None or self.process.returncode is not None:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
 
 class DistroboxManager(QObject):
     def __init__(
@@ -55,9 +67,11 @@ class DistroboxManager(QObject):
         image: str = "ubuntu:latest",
         ui_setup: "UISetup" = None,  # Change this line
         directory: str = ".",
+        on_output: callable = None,
     ):
         super().__init__()
         self.ui_setup = ui_setup  # Change this line
+        self.on_output = on_output
         self.created = False
         self.box_name = box_name
         self.image = image
@@ -103,8 +117,8 @@ class DistroboxManager(QObject):
         return shutil.which("podman") is not None
 
     async def _install_container_manager(self):
-        """Install container manager (Podman)."""
-        install_packages(["podman"])
+        """Install Podman, together with any other missing host package in the same transaction."""
+        check_and_install()
         # Verify installation
         if not shutil.which("podman"):
             raise EnvironmentError("Failed to install Podman.")
@@ -179,12 +193,20 @@ class DistroboxManager(QObject):
         if ephemeral:
             self.created = False
 
+    def abort(self):
+        """Stop the command currently running in the container."""
+        if self.worker:
+            print(f"Aborting command in {self.box_name}")
+            self.worker.terminate_process()
+
     @pyqtSlot(str)
     def append_text(self, text: str):
         """Append text to the QTextEdit box."""
         print(text)
         if self.ui_setup:
             self.ui_setup.output_text_manager.update_output_text(text)
+        if self.on_output:
+            self.on_output(text)
 
     @pyqtSlot()
     def worker_finished(self):
@@ -198,11 +220,18 @@ def run_ephemeral_command(
     directory=".",
     additional_packages: list = None,
     on_complete: callable = None,
+    on_output: callable = None,
+    on_started: callable = None,
 ):
     async def run():
         manager = DistroboxManager(
-            "ephemeral_runner", ui_setup=ui_setup, directory=directory
+            "ephemeral_runner",
+            ui_setup=ui_setup,
+            directory=directory,
+            on_output=on_output,
         )
+        if on_started:
+            on_started(manager)
         try:
             await manager.create(True, command, additional_packages=additional_packages)
             return True
@@ -0,0 +1,276 @@
+import errno
+import os
+from collections import namedtuple
+
+from core.installer import (
+    _UNSUPPORTED_ERRNOS,
+    MANIFEST_NAME,
+    InstallResult,
+    hardlink_file,
+    install_files,
+    is_unchanged,
+    manifest_entry,
+    read_manifest,
+    sync_tree,
+    walk_files,
+    write_manifest,
+)
+from core.store import STORE, store
+from core.trash import trash
+
+Generation = namedtuple("Generation", "number path created active")
+
+
+class GenerationError(Exception):
+    pass
+
+
+def _install_path(install_dir):
+    return os.path.normpath(os.path.abspath(os.path.expanduser(install_dir)))
+
+
+def generations_dir(install_dir):
+    """Where the generations of an install live: a hidden sibling directory."""
+    parent, name = os.path.split(_install_path(install_dir))
+    return os.path.join(parent, f".{name}.generations")
+
+
+def active_number(install_dir):
+    """The generation the install directory points to, or None."""
+    install_dir = _install_path(install_dir)
+    if not os.path.islink(install_dir):
+        return None
+    target = os.path.join(os.path.dirname(install_dir), os.readlink(install_dir))
+    if os.path.dirname(os.path.normpath(target)) != generations_dir(install_dir):
+        return None
+    name = os.path.basename(target)
+    return int(name) if name.isdigit() else None
+
+
+def list_generations(install_dir):
+    """Generations of an install, oldest first."""
+    root = generations_dir(install_dir)
+    active = active_number(install_dir)
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return []
+    generations = []
+    for name in names:
+        # Skips the .N.partial directories of interrupted installs
+        if not name.isdigit():
+            continue
+        path = os.path.join(root, name)
+        number = int(name)
+        generations.append(
+            Generation(number, path, os.path.getmtime(path), number == active)
+        )
+    generations.sort(key=lambda generation: generation.number)
+    return generations
+
+
+def activate(install_dir, number):
+    """Point the install directory at a generation, atomically."""
+    install_dir = _install_path(install_dir)
+    path = os.path.join(generations_dir(install_dir), str(number))
+    if not os.path.isdir(path):
+        raise GenerationError(f"No generation {number} of {install_dir}")
+    if os.path.islink(install_dir):
+        if active_number(install_dir) is None:
+            raise GenerationError(
+                f"{install_dir} is a link 64All didn't create, not replacing it"
+            )
+    elif os.path.lexists(install_dir):
+        raise GenerationError(f"{install_dir} isn't a generation link")
+
+    # Relative, so the link survives moving the parent directory
+    link_target = os.path.relpath(path, os.path.dirname(install_dir))
+    temp_link = os.path.join(
+        os.path.dirname(install_dir), f".{os.path.basename(install_dir)}.64all-tmp"
+    )
+    if os.path.lexists(temp_link):
+        os.unlink(temp_link)
+    os.symlink(link_target, temp_link)
+    os.replace(temp_link, install_dir)
+
+
+def _check_symlinks(directory):
+    """Raise OSError if symlinks can't be created in a directory (FAT, some FUSE mounts)."""
+    probe = os.path.join(directory, ".64all-symlink-probe")
+    if os.path.lexists(probe):
+        os.unlink(probe)
+    os.symlink(".", probe)
+    os.unlink(probe)
+
+
+def _is_foreign(install_dir):
+    """
+    True if something is at the install path that 64All can't manage as
+    generations: a link it didn't create, or a directory that isn't just an
+    earlier install, i.e. has no manifest or holds anything the manifest
+    doesn't account for (as ~/Games would).
+    """
+    if os.path.islink(install_dir):
+        return active_number(install_dir) is None
+    if os.path.isdir(install_dir):
+        names = set(os.listdir(install_dir))
+        installed = read_manifest(install_dir)
+        if not installed:
+            return bool(names)
+        top_level = {path.split(os.sep, 1)[0] for path in installed}
+        return not names <= top_level | {MANIFEST_NAME}
+    return os.path.lexists(install_dir)
+
+
+def _migrate_directory(install_dir):
+    """Turn an install made before generations into generation 1."""
+    root = generations_dir(install_dir)
+    os.makedirs(root, exist_ok=True)
+    number = max((g.number for g in list_generations(install_dir)), default=0) + 1
+    os.rename(install_dir, os.path.join(root, str(number)))
+    activate(install_dir, number)
+    print(f"Moved existing install {install_dir} to generation {number}")
+
+
+def _hardlink_pairs(pairs):
+    """
+    Hardlink (existing, new) path pairs. Returns the pairs that couldn't be
+    linked, e.g. because the filesystem doesn't support it.
+    """
+    for index, (existing, new_path) in enumerate(pairs):
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        try:
+            hardlink_file(existing, new_path)
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            return pairs[index:]
+    return []
+
+
+def prune_generations(install_dir, keep):
+    """Delete the oldest generations, keeping ``keep`` and always the active one."""
+    generations = list_generations(install_dir)
+    removed = []
+    for generation in generations[: max(0, len(generations) - max(1, keep))]:
+        if generation.active:
+            continue
+        trash.move(generation.path)
+        removed.append(generation.number)
+    return removed
+
+
+def install_generation(source_dir, install_dir, consume_source=False, keep=3):
+    """
+    Install a build as a new generation and switch the install directory to it.
+
+    The new generation is assembled in a .N.partial directory: files that
+    are unchanged since the active generation are hardlinked from it (so
+    they take no extra space), the rest is installed from the build, and
+    files the user added to the old generation (saves, configs, texture
+    packs) are linked over too. Only once it's complete is it renamed into
+    place and the symlink swapped, so an interrupted install never touches
+    the working one.
+
+    Returns (generation number, InstallResult). Where symlinks aren't
+    possible, or the install path holds a directory or link that 64All
+    didn't create, the directory is synced in place instead, with number
+    None.
+    """
+    install_dir = _install_path(install_dir)
+    root = generations_dir(install_dir)
+    if _is_foreign(install_dir):
+        # Never moved or replaced: install into it like before generations
+        print(f"{install_dir} wasn't installed by 64All, installing in place")
+        return None, sync_tree(source_dir, install_dir, consume_source)
+    try:
+        os.makedirs(os.path.dirname(install_dir), exist_ok=True)
+        _check_symlinks(os.path.dirname(install_dir))
+        if os.path.isdir(install_dir) and not os.path.islink(install_dir):
+            _migrate_directory(install_dir)
+        os.makedirs(root, exist_ok=True)
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED_ERRNOS and e.errno != errno.EBUSY:
+            raise
+        print(f"Generations not supported for {install_dir} ({e}), installing in place")
+        return None, sync_tree(source_dir, install_dir, consume_source)
+
+    for name in os.listdir(root):
+        if name.endswith(".partial"):
+            trash.move(os.path.join(root, name))
+
+    previous = active_number(install_dir)
+    previous_dir = os.path.join(root, str(previous)) if previous is not None else None
+    old_files = read_manifest(previous_dir) if previous_dir else {}
+    number = max((g.number for g in list_generations(install_dir)), default=0) + 1
+    partial_dir = os.path.join(root, f".{number}.partial")
+    os.makedirs(partial_dir)
+
+    new_files = {}
+    shared = {}
+    to_install = []
+    for path in walk_files(source_dir):
+        source = os.path.join(source_dir, path)
+        new_path = os.path.join(partial_dir, path)
+        entry = old_files.get(path)
+        if previous_dir and is_unchanged(
+            source, os.path.join(previous_dir, path), entry
+        ):
+            shared[new_path] = (os.path.join(previous_dir, path), source)
+            new_files[path] = entry
+        else:
+            to_install.append((source, new_path))
+            new_files[path] = None
+
+    # Files in the old generation we didn't install belong to the user
+    user_files = []
+    if previous_dir:
+        user_files = [
+            (os.path.join(previous_dir, path), os.path.join(partial_dir, path))
+            for path in walk_files(previous_dir)
+            if path != MANIFEST_NAME and path not in old_files and path not in new_files
+        ]
+
+    not_linked = _hardlink_pairs([(old, new) for new, (old, _) in shared.items()])
+    to_install.extend((shared[new][1], new) for _, new in not_linked)
+    # Large files go through the shared store, so other installs with the
+    # same assets link to the same data
+    stored = {}
+    if store.usable_for(root):
+        stored, to_install = store.install_files(to_install, consume_source)
+    strategies, bytes_written = install_files(to_install, consume_source)
+    if stored:
+        strategies[STORE] += len(stored)
+    # Never moved: the old generation has to stay intact for rollback
+    install_files(_hardlink_pairs(user_files), consume_source=False)
+
+    for path, entry in new_files.items():
+        if entry is None:
+            new_path = os.path.join(partial_dir, path)
+            new_files[path] = manifest_entry(new_path, stored.get(new_path))
+    write_manifest(partial_dir, new_files)
+
+    generation_dir = os.path.join(root, str(number))
+    os.rename(partial_dir, generation_dir)
+    os.utime(generation_dir)  # Creation time for `install list`
+    activate(install_dir, number)
+    prune_generations(install_dir, keep)
+
+    unchanged = len(shared) - len(not_linked)
+    return number, InstallResult(strategies, bytes_written, unchanged)
+
+
+def rollback(install_dir, number=None):
+    """
+    Switch back to an earlier generation (by default the one before the
+    active one). Returns the number of the generation now active.
+    """
+    generations = list_generations(install_dir)
+    active = active_number(install_dir)
+    if number is None:
+        older = [g.number for g in generations if active is None or g.number < active]
+        if not older:
+            raise GenerationError(f"No generation older than {active} to roll back to")
+        number = older[-1]
+    activate(install_dir, number)
+    return number
@@ -1,41 +1,54 @@
+import functools
 import os
-import shutil
 
-import git
 from PyQt6.QtCore import pyqtSignal, QObject
 from PyQt6.QtWidgets import QComboBox
 
+from core.trash import trash
 
-class CloneProgress(git.remote.RemoteProgress):
-    def __init__(self, text_signal, progress_signal):
-        super().__init__()
-        self.text_signal = text_signal
-        self.progress_signal = progress_signal
-        self.total_progress = 0
 
-    def update(self, op_code, cur_count, max_count=None, message=""):
-        super().update(op_code, cur_count, max_count, message)
+@functools.lru_cache(maxsize=None)
+def clone_progress_class():
+    """
+    Return the RemoteProgress subclass used for clone progress.
 
-        # Ensure max_count is a positive number to avoid division by zero or negative values
-        if max_count and max_count > 0:
-            self.total_progress = int((cur_count / max_count) * 100)
+    GitPython takes a noticeable part of startup to import, so the class is
+    only defined the first time a clone actually runs.
+    """
+    import git
 
-        # Ensure progress is within 0-100% range
-        self.total_progress = max(0, min(self.total_progress, 100))
+    class CloneProgress(git.remote.RemoteProgress):
+        def __init__(self, text_signal, progress_signal):
+            super().__init__()
+            self.text_signal = text_signal
+            self.progress_signal = progress_signal
+            self.total_progress = 0
 
-        # Emit progress
-        self.progress_signal.emit(self.total_progress)
+        def update(self, op_code, cur_count, max_count=None, message=""):
+            super().update(op_code, cur_count, max_count, message)
 
-        # Emit a progress message with color
-        progress_message = (
-            f"[32m Progress: {cur_count:,} out of {max_count:,} ({(cur_count / max_count) * 100:.2f}%) [0m"
-            if max_count
-            else f"[32m Progress: {cur_count:,}, max count unknown. [0m"
-        )
-        if message:
-            progress_message += f"[36m Message: {message} [0m"
+            # Ensure max_count is a positive number to avoid division by zero or negative values
+            if max_count and max_count > 0:
+                self.total_progress = int((cur_count / max_count) * 100)
+
+            # Ensure progress is within 0-100% range
+            self.total_progress = max(0, min(self.total_progress, 100))
+
+            # Emit progress
+            self.progress_signal.emit(self.total_progress)
 
-        self.text_signal.emit(progress_message)
+            # Emit a progress message with color
+            progress_message = (
+                f"[32m Progress: {cur_count:,} out of {max_count:,} ({(cur_count / max_count) * 100:.2f}%) [0m"
+                if max_count
+                else f"[32m Progress: {cur_count:,}, max count unknown. [0m"
+            )
+            if message:
+                progress_message += f"[36m Message: {message} [0m"
+
+            self.text_signal.emit(progress_message)
+
+    return CloneProgress
 
 
 class CloneWorker(QObject):
@@ -50,16 +63,20 @@ class CloneWorker(QObject):
         self.branch = branch
 
     def run(self):
+        import git
+
         try:
             self.text_signal.emit(f"Cloning {self.repo_url} into {self.clone_dir}\n")
-            
+
             # Check if the directory already exists
             if os.path.exists(self.clone_dir):
-                self.text_signal.emit(f"Directory {self.clone_dir} already exists. Removing it...\n")
-                shutil.rmtree(self.clone_dir)
-            
-            progress = CloneProgress(self.text_signal, self.progress_signal)
-            
+                self.text_signal.emit(
+                    f"Directory {self.clone_dir} already exists. Removing it...\n"
+                )
+                trash.move(self.clone_dir)
+
+            progress = clone_progress_class()(self.text_signal, self.progress_signal)
+
             # Use single-branch cloning
             git.Repo.clone_from(
                 self.repo_url,
@@ -67,9 +84,9 @@ class CloneWorker(QObject):
                 branch=self.branch,
                 progress=progress,
                 single_branch=True,
-                depth=1
+                depth=1,
             )
-            
+
             self.text_signal.emit("Cloning completed successfully.\n")
             self.finished_signal.emit(True)
         except git.exc.GitCommandError as e:
@@ -82,7 +99,42 @@ class CloneWorker(QObject):
             self.finished_signal.emit(False)
 
 
+class BranchListWorker(QObject):
+    finished_signal = pyqtSignal(str, list)
+
+    def __init__(self, repo_url):
+        super().__init__()
+        self.repo_url = repo_url
+
+    def run(self):
+        try:
+            branches = list_remote_branches(self.repo_url)
+        except Exception as e:
+            print(f"Error listing branches of {self.repo_url}: {e}\n")
+            branches = []
+        self.finished_signal.emit(self.repo_url, branches)
+
+
+def list_remote_branches(repo_url):
+    """Fetch only the branch names of a remote, without cloning."""
+    import git
+
+    result = git.cmd.Git().ls_remote("--heads", repo_url)
+    branch_lines = result.strip().split("\n")
+    return [line.split()[1].replace("refs/heads/", "") for line in branch_lines if line]
+
+
+def default_branch(branches):
+    if "master" in branches:
+        return "master"
+    if "main" in branches:
+        return "main"
+    return branches[0] if branches else ""
+
+
 def update_branch_menu(repo_name, repos, branch_menu: QComboBox):
+    import git
+
     try:
         print(f"Updating branch menu for repo: {repo_name}\n")
         repo_url = next(
@@ -92,24 +144,12 @@ def update_branch_menu(repo_name, repos, branch_menu: QComboBox):
             print("No repository URL found for the selected repository.\n")
             return
 
-        # Fetch only the branch names without cloning
-        result = git.cmd.Git().ls_remote("--heads", repo_url)
-
-        branch_lines = result.strip().split("\n")
-        branches = [line.split()[1].replace("refs/heads/", "") for line in branch_lines]
+        branches = list_remote_branches(repo_url)
         print(f"Branches found: {branches}\n")
 
-        default_branch = (
-            "master"
-            if "master" in branches
-            else "main"
-            if "main" in branches
-            else branches[0]
-        )
-
         branch_menu.clear()
         branch_menu.addItems(branches)
-        branch_menu.setCurrentText(default_branch)
+        branch_menu.setCurrentText(default_branch(branches))
 
     except git.exc.GitCommandError as e:
         print(f"Error in update_branch_menu: {e}\n")
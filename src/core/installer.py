@@ -0,0 +1,329 @@
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+COPY_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Written into the install directory by sync_tree
+MANIFEST_NAME = ".64all-manifest.json"
+MANIFEST_VERSION = 1
+
+RENAME = "rename"
+REFLINK = "reflink"
+HARDLINK = "hardlink"
+COPY = "copy"
+
+# Errors meaning "this strategy can't work here", as opposed to real I/O errors
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.EPERM,
+    errno.EMLINK,
+}
+
+
+class InstallResult(
+    namedtuple(
+        "InstallResult", "strategies bytes_written unchanged removed", defaults=(0, 0)
+    )
+):
+    """
+    ``strategies`` counts the files installed with each strategy; ``unchanged``
+    and ``removed`` are the files a sync skipped and deleted.
+    """
+
+    @property
+    def files(self):
+        return sum(self.strategies.values())
+
+    @property
+    def strategy(self):
+        """The strategy used for most files."""
+        return self.strategies.most_common(1)[0][0] if self.strategies else RENAME
+
+    def describe(self):
+        parts = [
+            f"{name} ({count} files)" for name, count in self.strategies.most_common()
+        ]
+        if self.unchanged:
+            parts.append(f"{self.unchanged} unchanged")
+        if self.removed:
+            parts.append(f"{self.removed} removed")
+        return f"{', '.join(parts) or 'nothing to install'}; {format_size(self.bytes_written)} written"
+
+
+def format_size(size):
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _temp_path(target):
+    directory, name = os.path.split(target)
+    return os.path.join(directory, f".{name}.64all-tmp")
+
+
+def _replace_via_temp(target, create):
+    """Create the new file next to the target, then atomically swap it in."""
+    temp_path = _temp_path(target)
+    if os.path.lexists(temp_path):
+        os.unlink(temp_path)
+    try:
+        create(temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.lexists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def reflink_file(source, target):
+    """Clone a file's extents (btrfs, XFS, bcachefs...): no data is written."""
+
+    def create(temp_path):
+        with open(source, "rb") as src, open(temp_path, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source, temp_path)
+
+    _replace_via_temp(target, create)
+
+
+def hardlink_file(source, target):
+    # A symlink is linked itself; following it breaks on dangling ones
+    _replace_via_temp(
+        target, lambda temp_path: os.link(source, temp_path, follow_symlinks=False)
+    )
+
+
+def copy_file(source, target):
+    # copy2 uses copy_file_range/sendfile, so the data stays in the kernel
+    _replace_via_temp(
+        target, lambda temp_path: shutil.copy2(source, temp_path, follow_symlinks=False)
+    )
+    return os.lstat(target).st_size
+
+
+def walk_files(source_dir):
+    """Yield the relative path of every file and symlink under a directory."""
+    for directory, dirnames, filenames in os.walk(source_dir):
+        relative = os.path.relpath(directory, source_dir)
+        # Symlinked directories are installed as links, not walked
+        for name in [d for d in dirnames if os.path.islink(os.path.join(directory, d))]:
+            dirnames.remove(name)
+            filenames.append(name)
+        for name in filenames:
+            yield os.path.normpath(os.path.join(relative, name))
+
+
+def install_files(
+    pairs, consume_source=False, copy_workers=COPY_WORKERS, allow_hardlink=True
+):
+    """
+    Install (source, target) file pairs with the cheapest strategy that works.
+
+    Rename (only if the source may be consumed), reflink, hardlink (only if it
+    is kept and ``allow_hardlink``), and copying in parallel as the fallback.
+    A strategy that fails with e.g. EXDEV is not tried again for the
+    remaining files. Returns (Counter of files per strategy, bytes written).
+    """
+    strategies = Counter()
+    if consume_source:
+        candidates = [RENAME, REFLINK]
+    elif allow_hardlink:
+        candidates = [REFLINK, HARDLINK]
+    else:
+        candidates = [REFLINK]
+    link_functions = {
+        RENAME: os.replace,
+        REFLINK: reflink_file,
+        HARDLINK: hardlink_file,
+    }
+
+    to_copy = []
+    for source, target in pairs:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.islink(source) and not consume_source:
+            to_copy.append((source, target))
+            continue
+        for strategy in list(candidates):
+            try:
+                link_functions[strategy](source, target)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                # Won't work for the rest of the tree either
+                candidates.remove(strategy)
+                continue
+            strategies[strategy] += 1
+            break
+        else:
+            to_copy.append((source, target))
+
+    bytes_written = 0
+    if to_copy:
+        with ThreadPoolExecutor(max_workers=copy_workers) as pool:
+            sizes = pool.map(lambda pair: copy_file(*pair), to_copy)
+            bytes_written = sum(sizes)
+        strategies[COPY] += len(to_copy)
+    return strategies, bytes_written
+
+
+def install_tree(
+    source_dir, target_dir, consume_source=False, copy_workers=COPY_WORKERS
+):
+    """
+    Install the contents of ``source_dir`` into ``target_dir``, overwriting files.
+
+    Files already in the target that aren't in the source are left alone.
+    Returns an InstallResult.
+    """
+    if consume_source and not os.path.exists(target_dir):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(target_dir)), exist_ok=True)
+            os.rename(source_dir, target_dir)
+            files = sum(1 for _ in walk_files(target_dir))
+            return InstallResult(Counter({RENAME: files}), 0)
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+
+    pairs = [
+        (os.path.join(source_dir, path), os.path.join(target_dir, path))
+        for path in walk_files(source_dir)
+    ]
+    strategies, bytes_written = install_files(pairs, consume_source, copy_workers)
+    return InstallResult(strategies, bytes_written)
+
+
+def file_hash(path):
+    """Fast content hash used when size and mtime can't tell whether a file changed."""
+    if os.path.islink(path):
+        return "link:" + os.readlink(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r") as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable install manifest in {directory}: {e}")
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("files", {})
+
+
+def write_manifest(directory, files):
+    path = os.path.join(directory, MANIFEST_NAME)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump({"version": MANIFEST_VERSION, "files": files}, file)
+    os.replace(temp_path, path)
+
+
+def manifest_entry(path, content_hash=None):
+    stat_result = os.lstat(path)
+    return {
+        "size": stat_result.st_size,
+        "mtime_ns": stat_result.st_mtime_ns,
+        "hash": content_hash,
+    }
+
+
+def is_unchanged(source, installed, entry):
+    """
+    True if ``installed`` still holds what the manifest recorded and ``source``
+    has the same content.
+
+    Size and mtime decide in the common cases; only files with the same size
+    but a new mtime (e.g. rebuilt but identical) are hashed. A hash missing
+    from the entry is filled in from the installed copy.
+    """
+    if entry is None:
+        return False
+    try:
+        installed_stat = os.lstat(installed)
+        source_stat = os.lstat(source)
+    except OSError:
+        return False
+    recorded = (entry["size"], entry["mtime_ns"])
+    if (installed_stat.st_size, installed_stat.st_mtime_ns) != recorded:
+        return False  # Changed or replaced since it was installed
+    if source_stat.st_size != entry["size"]:
+        return False
+    if source_stat.st_mtime_ns == entry["mtime_ns"]:
+        return True
+    if entry.get("hash") is None:
+        entry["hash"] = file_hash(installed)
+    return file_hash(source) == entry["hash"]
+
+
+def sync_tree(source_dir, target_dir, consume_source=False, copy_workers=COPY_WORKERS):
+    """
+    Make ``target_dir`` match ``source_dir``, writing only what changed.
+
+    The manifest left in the target by the previous sync says which files we
+    installed and in what state. Unchanged files are skipped, changed and new
+    ones installed with install_files, and files from the previous install
+    that are gone from the source are deleted. Files the user added to the
+    target are never touched.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    old_files = read_manifest(target_dir)
+    new_files = {}
+    pairs = []
+    unchanged = 0
+    for path in walk_files(source_dir):
+        source = os.path.join(source_dir, path)
+        installed = os.path.join(target_dir, path)
+        entry = old_files.get(path)
+        if is_unchanged(source, installed, entry):
+            new_files[path] = entry
+            unchanged += 1
+        else:
+            pairs.append((source, installed))
+            new_files[path] = None
+
+    strategies, bytes_written = install_files(pairs, consume_source, copy_workers)
+
+    removed = 0
+    for path in set(old_files) - set(new_files):
+        installed = os.path.join(target_dir, path)
+        entry = old_files[path]
+        try:
+            installed_stat = os.lstat(installed)
+        except FileNotFoundError:
+            continue
+        # Only delete it if it is still the file we installed
+        if (installed_stat.st_size, installed_stat.st_mtime_ns) == (
+            entry["size"],
+            entry["mtime_ns"],
+        ):
+            os.unlink(installed)
+            removed += 1
+
+    for path, entry in new_files.items():
+        if entry is None:
+            new_files[path] = manifest_entry(os.path.join(target_dir, path))
+    write_manifest(target_dir, new_files)
+    return InstallResult(strategies, bytes_written, unchanged, removed)
@@ -0,0 +1,85 @@
+import os
+import tempfile
+from array import array
+
+from core.paths import CACHE_DIR, ensure_dir
+
+
+class LogSpool:
+    """
+    Append-only on-disk store for log lines.
+
+    Only the byte offset of every ``CHECKPOINT_INTERVAL``-th line is kept in
+    memory, together with an opaque state captured when that line was added
+    (the log view stores the ANSI style there). Reading any line therefore
+    costs at most one checkpoint's worth of extra lines, while the in-memory
+    index stays a few kilobytes even for millions of lines.
+    """
+
+    CHECKPOINT_INTERVAL = 256
+
+    def __init__(self, directory=None):
+        # The cache dir rather than /tmp, which is often RAM-backed tmpfs
+        self.file = tempfile.TemporaryFile(dir=ensure_dir(directory or CACHE_DIR))
+        self.line_count = 0
+        self.size = 0
+        # Byte length of the last line, while it can still be removed
+        self.last_length = 0
+        self.checkpoints = array("Q")
+        self.checkpoint_states = []
+
+    def append(self, line, state=None):
+        """Append a single line (without its trailing newline); ignored once closed."""
+        if self.file.closed:
+            return
+        if self.line_count % self.CHECKPOINT_INTERVAL == 0:
+            self.checkpoints.append(self.size)
+            self.checkpoint_states.append(state)
+
+        data = line.encode("utf-8", "replace") + b"\n"
+        self.file.write(data)
+        self.size += len(data)
+        self.line_count += 1
+        self.last_length = len(data)
+
+    def remove_last(self):
+        """Remove the line appended last, e.g. a progress line about to be updated."""
+        if not self.last_length or self.file.closed:
+            return
+        self.line_count -= 1
+        self.size -= self.last_length
+        self.last_length = 0
+        if self.line_count % self.CHECKPOINT_INTERVAL == 0:
+            self.checkpoints.pop()
+            self.checkpoint_states.pop()
+        self.file.seek(self.size)
+        self.file.truncate()
+
+    def read_lines(self, start, count):
+        """
+        Read lines from disk.
+
+        Returns a ``(first, state, lines)`` tuple where ``first`` is the index of
+        the checkpoint at or before ``start``, ``state`` is the state stored for
+        it and ``lines`` runs from ``first`` up to ``start + count``.
+        """
+        start = max(0, min(start, self.line_count))
+        end = min(start + count, self.line_count)
+        if start >= end or self.file.closed:
+            return start, None, []
+
+        index = start // self.CHECKPOINT_INTERVAL
+        first = index * self.CHECKPOINT_INTERVAL
+
+        self.file.flush()
+        self.file.seek(self.checkpoints[index])
+        lines = [
+            self.file.readline()[:-1].decode("utf-8", "replace")
+            for _ in range(end - first)
+        ]
+        self.file.seek(0, os.SEEK_END)
+
+        return first, self.checkpoint_states[index], lines
+
+    def close(self):
+        self.file.close()
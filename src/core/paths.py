@@ -0,0 +1,18 @@
+import os
+
+
+def _xdg_dir(env_var, fallback):
+    base = os.environ.get(env_var) or os.path.expanduser(fallback)
+    return os.path.join(base, "64all")
+
+
+# Per-user locations, following the XDG base directory spec
+CACHE_DIR = _xdg_dir("XDG_CACHE_HOME", "~/.cache")
+DATA_DIR = _xdg_dir("XDG_DATA_HOME", "~/.local/share")
+CONFIG_DIR = _xdg_dir("XDG_CONFIG_HOME", "~/.config")
+
+
+def ensure_dir(path):
+    """Create a directory (and parents) if needed and return its path."""
+    os.makedirs(path, exist_ok=True)
+    return path
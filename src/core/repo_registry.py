@@ -0,0 +1,244 @@
+import hashlib
+import os
+import pickle
+import sys
+
+from core.paths import CACHE_DIR, ensure_dir
+
+SNAPSHOT_NAME = "repos.snapshot"
+SNAPSHOT_PATH = os.path.join(CACHE_DIR, SNAPSHOT_NAME)
+# Bump when the snapshot layout or the validation rules change
+SNAPSHOT_VERSION = 1
+
+# key: (required, accepted types)
+REPO_SCHEMA = {
+    "name": (True, (str,)),
+    "url": (True, (str,)),
+    "dependencies": (False, (list,)),
+    "info": (False, (dict,)),
+    "options": (False, (dict,)),
+}
+OPTION_SCHEMA = {
+    "default": (False, (str, int, float, bool)),
+    "recommended": (False, (str, int, float, bool)),
+    "values": (False, (list,)),
+    "description": (False, (str,)),
+    "advanced": (False, (bool,)),
+}
+
+
+class RepoConfigError(ValueError):
+    pass
+
+
+def _check_fields(data, schema, where):
+    for key, (required, types) in schema.items():
+        if key not in data:
+            if required:
+                raise RepoConfigError(f"{where}: missing '{key}'")
+        elif not isinstance(data[key], types):
+            expected = " or ".join(t.__name__ for t in types)
+            raise RepoConfigError(f"{where}: '{key}' must be a {expected}")
+
+
+def validate_repo(repo, source):
+    """Raise RepoConfigError if a repo entry doesn't match the schema."""
+    if not isinstance(repo, dict):
+        raise RepoConfigError(f"{source}: each repo must be a mapping")
+    where = f"{source}: {repo.get('name', '<unnamed>')}"
+    _check_fields(repo, REPO_SCHEMA, where)
+
+    for option_name, option in repo.get("options", {}).items():
+        if not isinstance(option, dict):
+            raise RepoConfigError(f"{where}: option {option_name} must be a mapping")
+        _check_fields(option, OPTION_SCHEMA, f"{where}: option {option_name}")
+        if "values" in option and "default" in option:
+            if option["default"] not in option["values"]:
+                raise RepoConfigError(
+                    f"{where}: option {option_name} default {option['default']!r} "
+                    f"is not one of its values"
+                )
+
+
+def parse_repo_file(file_path):
+    """Parse and validate one repo YAML file, dropping (and reporting) bad entries."""
+    import yaml
+
+    # The libyaml-based loader is several times faster when PyYAML was built with it
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(file_path, "rb") as file:
+        data = yaml.load(file, Loader=loader)
+
+    source = os.path.basename(file_path)
+    if isinstance(data, dict):
+        data = [data]
+    elif not isinstance(data, list):
+        print(f"Invalid data structure in {source}")
+        return []
+
+    repos = []
+    for repo in data:
+        try:
+            validate_repo(repo, source)
+        except RepoConfigError as e:
+            print(f"Skipping invalid repo config: {e}")
+            continue
+        repos.append(repo)
+    return repos
+
+
+def _file_sha1(file_path):
+    with open(file_path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+class RepoRegistry:
+    """
+    The repo configs from config/repos, parsed once and indexed by name.
+
+    Parsed files are kept in a pickled snapshot, one entry per YAML file with
+    its size, mtime and SHA-1. A file is only parsed again when both its
+    stat and its content changed, so the snapshot generated at packaging time
+    stays valid in the frozen build, where extraction resets the mtimes.
+    """
+
+    def __init__(
+        self, config_dir, snapshot_path=SNAPSHOT_PATH, bundled_snapshot_path=None
+    ):
+        self.config_dir = config_dir
+        self.snapshot_path = snapshot_path
+        self.bundled_snapshot_path = bundled_snapshot_path
+        self.files = {}
+        self.repos = []
+        self.by_name = {}
+        # Set when only file metadata changed since the snapshot was written
+        self.snapshot_stale = False
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+    def names(self):
+        return [repo["name"] for repo in self.repos]
+
+    def load(self):
+        """Load the configs, reusing the snapshot for files that didn't change."""
+        self.files = self._read_snapshot(self.snapshot_path)
+        if not self.files and self.bundled_snapshot_path:
+            self.files = self._read_snapshot(self.bundled_snapshot_path)
+        changed = self.refresh()
+        if changed or self.snapshot_stale or not os.path.exists(self.snapshot_path):
+            self.save_snapshot()
+        return self.repos
+
+    def refresh(self):
+        """
+        Bring the registry in line with the files on disk.
+
+        Returns the names of the YAML files that were added, reparsed or
+        removed; the rest are taken from memory without reading them.
+        """
+        try:
+            filenames = sorted(
+                f for f in os.listdir(self.config_dir) if f.endswith(".yaml")
+            )
+        except OSError as e:
+            print(f"Error reading repo configs from {self.config_dir}: {e}")
+            filenames = []
+
+        changed = set(self.files) - set(filenames)
+        files = {}
+        for filename in filenames:
+            file_path = os.path.join(self.config_dir, filename)
+            try:
+                stat_result = os.stat(file_path)
+                entry = self.files.get(filename)
+                if entry and (entry["size"], entry["mtime_ns"]) == (
+                    stat_result.st_size,
+                    stat_result.st_mtime_ns,
+                ):
+                    files[filename] = entry
+                    continue
+
+                sha1 = _file_sha1(file_path)
+                if entry and entry["sha1"] == sha1:
+                    repos = entry["repos"]
+                    self.snapshot_stale = True
+                else:
+                    repos = parse_repo_file(file_path)
+                    changed.add(filename)
+            except Exception as e:
+                print(f"Error loading {filename}: {str(e)}")
+                # Keep the last good version, e.g. while the file is being edited
+                if filename in self.files:
+                    files[filename] = self.files[filename]
+                continue
+            files[filename] = {
+                "size": stat_result.st_size,
+                "mtime_ns": stat_result.st_mtime_ns,
+                "sha1": sha1,
+                "repos": repos,
+            }
+
+        self.files = files
+        self._index()
+        return changed
+
+    def _index(self):
+        self.repos = []
+        self.by_name = {}
+        for filename, entry in self.files.items():
+            for repo in entry["repos"]:
+                if repo["name"] in self.by_name:
+                    print(f"Ignoring duplicate repo {repo['name']} in {filename}")
+                    continue
+                self.by_name[repo["name"]] = repo
+                self.repos.append(repo)
+
+    @staticmethod
+    def _read_snapshot(path):
+        try:
+            with open(path, "rb") as file:
+                snapshot = pickle.load(file)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Ignoring unreadable repo config snapshot {path}: {e}")
+            return {}
+        if (
+            not isinstance(snapshot, dict)
+            or snapshot.get("version") != SNAPSHOT_VERSION
+        ):
+            return {}
+        return snapshot["files"]
+
+    def save_snapshot(self, path=None):
+        path = path or self.snapshot_path
+        snapshot = {"version": SNAPSHOT_VERSION, "files": self.files}
+        try:
+            ensure_dir(os.path.dirname(os.path.abspath(path)))
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "wb") as file:
+                pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error saving repo config snapshot: {e}")
+            return
+        self.snapshot_stale = False
+
+
+def main(argv):
+    """Pre-generate a snapshot at packaging time: ``python -m core.repo_registry CONFIG_DIR OUTPUT``."""
+    if len(argv) != 2:
+        print("usage: python -m core.repo_registry CONFIG_DIR OUTPUT")
+        return 2
+    config_dir, output = argv
+    registry = RepoRegistry(config_dir, snapshot_path=output)
+    registry.files = {}
+    registry.refresh()
+    registry.save_snapshot()
+    print(f"Wrote {len(registry.repos)} repo config(s) to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
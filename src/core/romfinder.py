@@ -1,75 +1,238 @@
 import hashlib
+import json
+import mmap
 import os
-import sys
-import time
-
-from PyQt6.QtWidgets import QApplication, QFileDialog, QMessageBox
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import (
+    QApplication,
+    QDialog,
+    QDialogButtonBox,
+    QFileDialog,
+    QInputDialog,
+    QLabel,
+    QListWidget,
+    QListWidgetItem,
+    QMessageBox,
+    QVBoxLayout,
+)
+
+from core.paths import CACHE_DIR, ensure_dir
+from core.romformat import ROM_EXTENSIONS, detect_rom_format, hash_rom, to_big_endian
+
+HASH_CACHE_PATH = os.path.join(CACHE_DIR, "rom_hashes.json")
+HASH_WORKERS = min(4, os.cpu_count() or 1)
+
+# Every retail SM64 ROM is exactly 8 MiB
+SM64_ROM_SIZE = 8 * 1024 * 1024
+N64_HEADER_SIZE = 0x40
+# The game code lives at 0x3B..0x3E ("NSME", "NSMJ", ...); "SM" is Super Mario 64
+GAME_ID_SLICE = slice(0x3C, 0x3E)
+SM64_GAME_ID = b"SM"
 
 
 def _compute_file_hash(file_path, hash_algorithm="sha1"):
-    """Compute the hash of a file using the specified algorithm."""
+    """
+    Compute the hash of a file using the specified algorithm.
+
+    Byte-swapped (.v64/.n64) ROMs are hashed as their big-endian conversion so
+    they can be compared against KNOWN_HASHES.
+    """
     hash_func = hashlib.new(hash_algorithm)
     with open(file_path, "rb") as f:
-        while chunk := f.read(8192):
-            hash_func.update(chunk)
+        rom_format = detect_rom_format(f.read(4))
+        if rom_format in ("v64", "n64"):
+            return hash_rom(file_path, rom_format, hash_algorithm)
+        if os.fstat(f.fileno()).st_size == 0:
+            return hash_func.hexdigest()
+        # One update over the whole mapping; hashlib drops the GIL while hashing
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            hash_func.update(mapped)
     return hash_func.hexdigest()
 
 
+def is_sm64_candidate(file_path, stat_result=None):
+    """Cheap pre-check on size and N64 header before a ROM is hashed."""
+    try:
+        if stat_result is None:
+            stat_result = os.stat(file_path)
+        if stat_result.st_size != SM64_ROM_SIZE:
+            return False
+        with open(file_path, "rb") as f:
+            header = f.read(N64_HEADER_SIZE)
+    except OSError:
+        return False
+    rom_format = detect_rom_format(header)
+    if rom_format is None:
+        return False
+    return to_big_endian(header, rom_format)[GAME_ID_SLICE] == SM64_GAME_ID
+
+
+class RomHashCache:
+    """
+    Persistent cache of file hashes keyed by (device, inode, size, mtime_ns).
+
+    A file that is modified gets a new size and/or mtime and therefore a new
+    key, so its stale hash is never returned; the old entry for that inode is
+    dropped when the new one is stored.
+    """
+
+    MAX_ENTRIES = 1024
+
+    def __init__(self, cache_path=HASH_CACHE_PATH):
+        self.cache_path = cache_path
+        self.entries = {}
+        self.dirty = False
+        # Hashes are computed from a thread pool
+        self.lock = threading.Lock()
+        try:
+            with open(cache_path, "r") as file:
+                self.entries = json.load(file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable ROM hash cache {cache_path}: {e}")
+
+    @staticmethod
+    def _inode_key(stat_result, hash_algorithm):
+        return f"{hash_algorithm}:{stat_result.st_dev}:{stat_result.st_ino}:"
+
+    @classmethod
+    def _key(cls, stat_result, hash_algorithm):
+        return (
+            f"{cls._inode_key(stat_result, hash_algorithm)}"
+            f"{stat_result.st_size}:{stat_result.st_mtime_ns}"
+        )
+
+    def lookup(self, stat_result, hash_algorithm="sha1"):
+        with self.lock:
+            return self.entries.get(self._key(stat_result, hash_algorithm))
+
+    def store(self, stat_result, file_hash, hash_algorithm="sha1"):
+        inode_key = self._inode_key(stat_result, hash_algorithm)
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(inode_key)]:
+                del self.entries[key]
+            self.entries[self._key(stat_result, hash_algorithm)] = file_hash
+            self.dirty = True
+
+    def file_hash(self, file_path, hash_algorithm="sha1"):
+        """Return the file's hash, only reading it if the cache has no match."""
+        stat_result = os.stat(file_path)
+        cached = self.lookup(stat_result, hash_algorithm)
+        if cached:
+            return cached
+
+        file_hash = _compute_file_hash(file_path, hash_algorithm)
+        # Don't cache a file that changed while we were reading it
+        if self._key(os.stat(file_path), hash_algorithm) == self._key(
+            stat_result, hash_algorithm
+        ):
+            self.store(stat_result, file_hash, hash_algorithm)
+        return file_hash
+
+    def save(self):
+        if not self.dirty:
+            return
+        with self.lock:
+            entries = list(self.entries.items())[-self.MAX_ENTRIES :]
+        try:
+            # A temp file of its own: the library scan and ROM selection both save
+            fd, temp_path = tempfile.mkstemp(
+                dir=ensure_dir(os.path.dirname(self.cache_path)), suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w") as file:
+                    json.dump(dict(entries), file)
+                os.replace(temp_path, self.cache_path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            self.dirty = False
+        except OSError as e:
+            print(f"Error saving ROM hash cache: {e}")
+
+
 def _prompt_user_to_select_file(file_list):
     """Prompt the user to select a single file from a list of valid files."""
     app = QApplication.instance()
     if app is None:
         app = QApplication([])
 
-    # Display the information message box
-    QMessageBox.information(
-        None, "Select ROM File", "Multiple valid ROM files found. Please select one."
+    selected_file, accepted = QInputDialog.getItem(
+        None,
+        "Select ROM File",
+        "Multiple valid ROM files found. Please select one:",
+        file_list,
+        0,
+        False,
     )
+    if accepted and selected_file:
+        return selected_file
+    return None
 
-    # Ensure the message box is processed and closed
-    app.processEvents()
-    time.sleep(0.5)  # Add a small delay to ensure the message box is rendered
 
-    # Open the file dialog for selection
-    dialog = QFileDialog()
-    dialog.setFileMode(QFileDialog.FileMode.ExistingFiles)
-    dialog.setNameFilter("N64 ROM files (*.z64)")
-    dialog.setViewMode(QFileDialog.ViewMode.List)
-    dialog.setDirectory(
-        os.getcwd()
-    )  # Set the directory to the current working directory
+def _prompt_user_to_select_regions(region_files):
+    """Let the user tick the regions to build. ``region_files`` maps region -> path."""
+    app = QApplication.instance()
+    if app is None:
+        app = QApplication([])
 
-    # Set options to ensure only one file can be selected
-    dialog.setOption(
-        QFileDialog.Option.DontUseNativeDialog
-    )  # Optional: Use custom dialog for consistency
+    dialog = QDialog()
+    dialog.setWindowTitle("Select Regions")
+    layout = QVBoxLayout(dialog)
+    layout.addWidget(
+        QLabel("ROMs of several regions found. Select the versions to build:")
+    )
+    region_list = QListWidget()
+    for region, path in region_files.items():
+        item = QListWidgetItem(f"{region.upper()}  {path}")
+        item.setData(Qt.ItemDataRole.UserRole, region)
+        item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+        item.setCheckState(Qt.CheckState.Checked)
+        region_list.addItem(item)
+    layout.addWidget(region_list)
+    buttons = QDialogButtonBox(
+        QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+    )
+    buttons.accepted.connect(dialog.accept)
+    buttons.rejected.connect(dialog.reject)
+    layout.addWidget(buttons)
 
-    if dialog.exec() == QFileDialog.DialogCode.Accepted:
-        selected_files = dialog.selectedFiles()
-        if selected_files:
-            return selected_files[0]  # Return the first (and only) selected file
-    return None
+    if dialog.exec() != QDialog.DialogCode.Accepted:
+        return []
+    return [
+        region_list.item(row).data(Qt.ItemDataRole.UserRole)
+        for row in range(region_list.count())
+        if region_list.item(row).checkState() == Qt.CheckState.Checked
+    ]
 
 
 def _prompt_user_for_file():
-    """Prompt the user to select a .z64 file and inform them of the specific requirement."""
+    """Prompt the user to select a ROM file and inform them of the specific requirement."""
     app = QApplication.instance()
     if app is None:
         app = QApplication([])
 
     # Display the information message box
     QMessageBox.information(
-        None, "Select ROM File", "Please select a valid Mario 64 .z64 ROM file."
+        None,
+        "Select ROM File",
+        "Please select a valid Mario 64 ROM file (.z64, .v64 or .n64).",
     )
 
     # Ensure the message box is processed and closed
     app.processEvents()
-    time.sleep(0.5)  # Add a small delay to ensure the message box is rendered
 
     # Open the file dialog
     dialog = QFileDialog()
     dialog.setFileMode(QFileDialog.FileMode.ExistingFiles)
-    dialog.setNameFilter("N64 ROM files (*.z64)")
+    dialog.setNameFilter("N64 ROM files (*.z64 *.v64 *.n64)")
     dialog.setViewMode(QFileDialog.ViewMode.List)
 
     # Set options to ensure only one file can be selected
@@ -81,7 +244,7 @@ def _prompt_user_for_file():
         selected_files = dialog.selectedFiles()
         if selected_files:
             return selected_files[0]  # Return the first (and only) selected file
-    sys.exit()
+    return None
 
 
 def get_key_from_value(dictionary, value):
@@ -102,26 +265,80 @@ class N64RomValidator:
 
     def __init__(self):
         self.file_path = None
+        self.hash_cache = RomHashCache()
+
+    def validate_files(self, file_paths):
+        """
+        Return (region, path) for each file that is a known SM64 ROM.
+
+        Files the hash cache already knows cost one stat. The rest are first
+        rejected by size and N64 header, and only the survivors are hashed,
+        concurrently.
+        """
+        region_by_hash = {
+            file_hash: key for key, file_hash in self.KNOWN_HASHES.items()
+        }
+        hashes = {}
+        candidates = []
+        for file_path in file_paths:
+            try:
+                stat_result = os.stat(file_path)
+            except OSError:
+                continue
+            cached = self.hash_cache.lookup(stat_result)
+            if cached:
+                hashes[file_path] = cached
+            elif is_sm64_candidate(file_path, stat_result):
+                candidates.append(file_path)
+
+        if candidates:
+            with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+                hashes.update(
+                    zip(candidates, pool.map(self.hash_cache.file_hash, candidates))
+                )
+            self.hash_cache.save()
+
+        return [
+            (region_by_hash[hashes[file_path]], file_path)
+            for file_path in file_paths
+            if hashes.get(file_path) in region_by_hash
+        ]
 
     def check_rom_files(self):
-        """Check for .z64 files, compute their hashes, and return those with known hashes."""
+        """Check for ROM files, compute their hashes, and return those with known hashes."""
         current_directory = os.getcwd()
-        rom_files = [f for f in os.listdir(current_directory) if f.endswith(".z64")]
+        rom_files = [
+            os.path.join(current_directory, f)
+            for f in os.listdir(current_directory)
+            if f.lower().endswith(ROM_EXTENSIONS)
+        ]
+        return self.validate_files(rom_files)
+
+    def select_regions(self, valid_files):
+        """
+        Choose the ROMs to build from (region, path) candidates, one per region.
 
-        valid_files = []
-        for file_name in rom_files:
-            file_path = os.path.join(current_directory, file_name)
-            file_hash = _compute_file_hash(file_path)
-            if file_hash in self.KNOWN_HASHES.values():
-                key = get_key_from_value(self.KNOWN_HASHES, file_hash)
-                valid_files.append((key, file_path))
+        With ROMs of a single region (or none) this is find_or_select_file;
+        otherwise the user picks the regions to build side by side. Returns
+        {region: path}, empty if nothing was selected.
+        """
+        region_files = {}
+        for region, path in valid_files:
+            region_files.setdefault(region, path)
+        if len(region_files) < 2:
+            region, path = self.find_or_select_file(valid_files)
+            return {region: path} if path else {}
 
-        return valid_files
+        selected = _prompt_user_to_select_regions(region_files)
+        return {region: region_files[region] for region in selected}
 
-    def find_or_select_file(self):
+    def find_or_select_file(self, valid_files=None):
         """
         Determine or choose an N64 ROM file for further processing.
 
+        ``valid_files`` is a list of (region, path) candidates, e.g. from the ROM
+        library; by default the current working directory is checked.
+
         If valid files are found in the system:
         1. If there is exactly one valid file, it is automatically selected.
         2. If there are multiple valid files, the user is prompted to select one.
@@ -134,7 +351,8 @@ class N64RomValidator:
         Returns:
             tuple: Contains the file region and the file path of the selected valid N64 ROM, or (None, None) if no valid file is ultimately selected.
         """
-        valid_files = self.check_rom_files()
+        if valid_files is None:
+            valid_files = self.check_rom_files()
         final_file_region = None
         final_file_path = None
 
@@ -164,9 +382,9 @@ class N64RomValidator:
             while True:
                 self.file_path = _prompt_user_for_file()
                 if self.file_path:
-                    file_hash = _compute_file_hash(self.file_path)
-                    key = get_key_from_value(self.KNOWN_HASHES, file_hash)
-                    if key:
+                    validated = self.validate_files([self.file_path])
+                    if validated:
+                        key = validated[0][0]
                         final_file_region = key
                         final_file_path = self.file_path
                         print(f"Selected valid ROM: {self.file_path}")
@@ -175,9 +393,9 @@ class N64RomValidator:
                         QMessageBox.critical(
                             None,
                             "Invalid ROM",
-                            "Invalid ROM! Please select a valid Mario 64 .z64 file.",
+                            "Invalid ROM! Please select a valid Mario 64 ROM file.",
                         )
-                        print(f"Computed Hash: {file_hash}, Expected Hash: None")
+                        print(f"Rejected ROM: {self.file_path}")
                 else:
                     print("No file selected.")
                     break
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import tempfile
+from array import array
+
+from core.paths import CACHE_DIR, ensure_dir
+
+ROM_STORE_DIR = os.path.join(CACHE_DIR, "roms")
+ROM_EXTENSIONS = (".z64", ".v64", ".n64")
+CHUNK_SIZE = 1024 * 1024
+
+# First word of the header in each byte order
+ROM_FORMATS = {
+    b"\x80\x37\x12\x40": "z64",  # big-endian, what the decomp tools expect
+    b"\x37\x80\x40\x12": "v64",  # 16-bit byte-swapped
+    b"\x40\x12\x37\x80": "n64",  # 32-bit little-endian
+}
+
+
+def _typecode(size):
+    return next(code for code in "HILQ" if array(code).itemsize == size)
+
+
+# Array type whose byteswap() converts each format to big-endian
+_SWAP_TYPECODES = {"v64": _typecode(2), "n64": _typecode(4)}
+
+
+def detect_rom_format(header):
+    """Return "z64", "v64" or "n64" from the first word of a ROM, or None."""
+    return ROM_FORMATS.get(bytes(header[:4]))
+
+
+def to_big_endian(data, rom_format):
+    """Return a big-endian copy of a (small) buffer, e.g. a ROM header."""
+    if rom_format not in _SWAP_TYPECODES:
+        return bytes(data)
+    words = array(_SWAP_TYPECODES[rom_format])
+    words.frombytes(bytes(data[: len(data) - len(data) % words.itemsize]))
+    words.byteswap()
+    return words.tobytes()
+
+
+def iter_big_endian_chunks(file, rom_format, chunk_size=CHUNK_SIZE):
+    """
+    Yield the contents of an open ROM file converted to big-endian.
+
+    Data is read straight into a preallocated array and swapped in place by
+    array.byteswap(), so nothing is copied per chunk. The yielded memoryview
+    is only valid until the next iteration.
+    """
+    typecode = _SWAP_TYPECODES.get(rom_format)
+    words = array(typecode or "B", bytes(chunk_size))
+    view = memoryview(words).cast("B")
+    while True:
+        read = file.readinto(view)
+        if not read:
+            break
+        if typecode:
+            words.byteswap()
+        yield view[:read]
+
+
+def hash_rom(file_path, rom_format, hash_algorithm="sha1"):
+    """Hash a byte-swapped ROM as if it were a .z64, without writing it out."""
+    hash_func = hashlib.new(hash_algorithm)
+    with open(file_path, "rb") as file:
+        for chunk in iter_big_endian_chunks(file, rom_format):
+            hash_func.update(chunk)
+    return hash_func.hexdigest()
+
+
+def rom_file_format(file_path):
+    with open(file_path, "rb") as file:
+        return detect_rom_format(file.read(4))
+
+
+def materialize_z64(file_path, file_hash, store_dir=ROM_STORE_DIR):
+    """
+    Return the path of a big-endian copy of a ROM.
+
+    .z64 files are returned as is. Byte-swapped dumps are converted once into
+    a content-addressed store (``<sha1>.z64``) and reused from there.
+    """
+    rom_format = rom_file_format(file_path)
+    if rom_format in (None, "z64"):
+        return file_path
+
+    store_path = os.path.join(store_dir, f"{file_hash}.z64")
+    if os.path.exists(store_path):
+        return store_path
+
+    ensure_dir(store_dir)
+    fd, temp_path = tempfile.mkstemp(dir=store_dir, suffix=".tmp")
+    try:
+        with open(file_path, "rb") as source, os.fdopen(fd, "wb") as target:
+            for chunk in iter_big_endian_chunks(source, rom_format):
+                target.write(chunk)
+        os.replace(temp_path, store_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    print(f"Converted {rom_format} ROM {file_path} to {store_path}")
+    return store_path
@@ -0,0 +1,289 @@
+import json
+import os
+import threading
+
+from core.paths import CACHE_DIR, ensure_dir
+from core.romfinder import N64RomValidator
+from core.romformat import ROM_EXTENSIONS
+from core.settings import load_settings
+
+LIBRARY_INDEX_PATH = os.path.join(CACHE_DIR, "rom_library.json")
+
+
+def search_roots(settings=None):
+    """The launch directory plus the configured ROM search roots that exist."""
+    settings = settings or load_settings()
+    roots = []
+    for root in [os.getcwd()] + list(settings["rom_search_roots"]):
+        root = os.path.realpath(os.path.expanduser(root))
+        if os.path.isdir(root) and root not in roots:
+            roots.append(root)
+    return roots
+
+
+def _is_under(path, directory):
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+class RomLibrary:
+    """
+    Persistent index of the valid SM64 ROMs under the search roots.
+
+    The first scan walks the roots with os.scandir and validates every
+    ROM-like file through N64RomValidator (hash cache, header fast-reject,
+    parallel hashing). After that the saved index is only refreshed:
+    directories whose mtime changed are rescanned one level deep, new
+    subdirectories walked, and the indexed ROMs revalidated, which costs a
+    stat each thanks to the hash cache. A watcher's change notification
+    rescans a single directory the same way. ROMs the user picked by hand
+    are kept even when they are outside the roots.
+    """
+
+    def __init__(self, index_path=LIBRARY_INDEX_PATH):
+        self.index_path = index_path
+        self.validator = N64RomValidator()
+        self.lock = threading.Lock()
+        self.rom_regions = {}
+        # Scanned directory -> [its mtime_ns when scanned, depth below its root]
+        self.directories = {}
+        # Paths added with add(), never dropped by a scan
+        self.manual = set()
+        # Set to make a running scan give up without touching the index
+        self.cancelled = threading.Event()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.index_path, "r") as file:
+                index = json.load(file)
+            self.rom_regions = dict(index.get("roms", {}))
+            directories = index.get("directories", {})
+            # An index from before mtimes were kept is walked again
+            self.directories = directories if isinstance(directories, dict) else {}
+            self.manual = set(index.get("manual", []))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable ROM library index {self.index_path}: {e}")
+
+    def save(self):
+        with self.lock:
+            index = {
+                "roms": dict(self.rom_regions),
+                "directories": dict(sorted(self.directories.items())),
+                "manual": sorted(self.manual),
+            }
+        try:
+            ensure_dir(os.path.dirname(self.index_path))
+            temp_path = f"{self.index_path}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump(index, file, indent=2)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"Error saving ROM library index: {e}")
+
+    def roms(self):
+        """Return (region, path) for every indexed ROM that still exists."""
+        with self.lock:
+            items = sorted(self.rom_regions.items())
+        return [(region, path) for path, region in items if os.path.isfile(path)]
+
+    def add(self, region, path):
+        """Remember a ROM the user picked, wherever it is."""
+        path = os.path.abspath(path)
+        with self.lock:
+            self.rom_regions[path] = region
+            self.manual.add(path)
+        self.save()
+
+    def scan(self, roots=None, max_depth=None):
+        """
+        Re-index the search roots with a full recursive walk. Only entries
+        under the walked roots are replaced. Returns True if the set of ROMs
+        changed.
+        """
+        settings = load_settings()
+        roots = search_roots(settings) if roots is None else roots
+        max_depth = settings["rom_scan_max_depth"] if max_depth is None else max_depth
+
+        directories = {}
+        rom_files = []
+        for root in roots:
+            self._walk(root, 0, max_depth, directories, rom_files)
+        if self.cancelled.is_set():
+            return False
+
+        valid_files = self.validator.validate_files(rom_files)
+        with self.lock:
+            before = dict(self.rom_regions)
+            self.rom_regions = {
+                path: region
+                for path, region in self.rom_regions.items()
+                if path in self.manual
+                or not any(_is_under(path, root) for root in roots)
+            }
+            self.rom_regions.update((path, region) for region, path in valid_files)
+            self.directories = {
+                directory: entry
+                for directory, entry in self.directories.items()
+                if not any(_is_under(directory, root) for root in roots)
+            }
+            self.directories.update(directories)
+            changed = before != self.rom_regions
+        self.save()
+        print(f"ROM library: {len(valid_files)} valid ROM(s) in {len(roots)} root(s)")
+        return changed
+
+    def refresh(self):
+        """
+        Bring the saved index up to date at startup without walking
+        everything again. Returns True if the set of ROMs changed.
+        """
+        settings = load_settings()
+        roots = search_roots(settings)
+        with self.lock:
+            before = dict(self.rom_regions)
+            # Forget what's under roots that were removed from the settings
+            self.rom_regions = {
+                path: region
+                for path, region in self.rom_regions.items()
+                if path in self.manual or any(_is_under(path, root) for root in roots)
+            }
+            self.directories = {
+                directory: entry
+                for directory, entry in self.directories.items()
+                if any(_is_under(directory, root) for root in roots)
+            }
+            known = dict(self.directories)
+
+        new_roots = [root for root in roots if root not in known]
+        if new_roots:
+            self.scan(new_roots, settings["rom_scan_max_depth"])
+        for directory, (mtime_ns, _) in known.items():
+            if self.cancelled.is_set():
+                return False
+            try:
+                stale = os.stat(directory).st_mtime_ns != mtime_ns
+            except OSError:
+                stale = True
+            if stale:
+                self.scan_directory(directory, save=False)
+
+        # Files replaced or deleted in place don't change their directory's mtime
+        with self.lock:
+            paths = list(self.rom_regions)
+        valid = {
+            path: region
+            for region, path in self.validator.validate_files(
+                [path for path in paths if os.path.isfile(path)]
+            )
+        }
+        with self.lock:
+            for path in paths:
+                if path in valid:
+                    self.rom_regions[path] = valid[path]
+                elif os.path.exists(path) or path not in self.manual:
+                    # A missing manual pick may be on a drive that isn't mounted
+                    self.rom_regions.pop(path, None)
+                    self.manual.discard(path)
+            changed = before != self.rom_regions
+        self.save()
+        print(f"ROM library: {len(self.roms())} valid ROM(s), index refreshed")
+        return changed
+
+    def scan_directory(self, directory, save=True):
+        """
+        Re-index one directory after a change notification.
+
+        Only the entries directly inside it are looked at: its ROM files are
+        revalidated and subdirectories the index doesn't know yet are
+        walked. Entries for files and subdirectories that are gone are
+        dropped. Returns True if the set of ROMs changed.
+        """
+        directory = os.path.realpath(directory)
+        max_depth = load_settings()["rom_scan_max_depth"]
+        with self.lock:
+            known = dict(self.directories)
+        depth = known.get(directory, [0, 0])[1]
+
+        directories = {}
+        rom_files = []
+        exists = os.path.isdir(directory)
+        subdirectories = []
+        if exists:
+            subdirectories = self._scan_one(
+                directory, depth, max_depth, directories, rom_files
+            )
+            for subdirectory in subdirectories:
+                if subdirectory not in known:
+                    self._walk(
+                        subdirectory, depth + 1, max_depth, directories, rom_files
+                    )
+        if self.cancelled.is_set():
+            return False
+        valid_files = self.validator.validate_files(rom_files)
+
+        if exists:
+            gone = [
+                d
+                for d in known
+                if os.path.dirname(d) == directory and d not in subdirectories
+            ]
+        else:
+            gone = [directory]
+        with self.lock:
+            before = dict(self.rom_regions)
+            self.rom_regions = {
+                path: region
+                for path, region in self.rom_regions.items()
+                if path in self.manual
+                or not (
+                    os.path.dirname(path) == directory
+                    or any(_is_under(path, d) for d in gone)
+                )
+            }
+            self.rom_regions.update((path, region) for region, path in valid_files)
+            self.directories = {
+                d: entry
+                for d, entry in self.directories.items()
+                if not any(_is_under(d, g) for g in gone)
+            }
+            self.directories.update(directories)
+            changed = before != self.rom_regions
+        if save:
+            self.save()
+        return changed
+
+    def _walk(self, root, depth, max_depth, directories, rom_files):
+        stack = [(root, depth)]
+        while stack and not self.cancelled.is_set():
+            directory, depth = stack.pop()
+            for subdirectory in self._scan_one(
+                directory, depth, max_depth, directories, rom_files
+            ):
+                stack.append((subdirectory, depth + 1))
+
+    @staticmethod
+    def _scan_one(directory, depth, max_depth, directories, rom_files):
+        """
+        Note a directory and collect the ROM-like files directly in it.
+        Returns the subdirectories within ``max_depth``.
+        """
+        subdirectories = []
+        try:
+            # Taken first: a change during the scan leaves it stale
+            directories[directory] = [os.stat(directory).st_mtime_ns, depth]
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if depth < max_depth:
+                            subdirectories.append(entry.path)
+                    elif (
+                        entry.name.lower().endswith(ROM_EXTENSIONS) and entry.is_file()
+                    ):
+                        rom_files.append(entry.path)
+        except OSError as e:
+            print(f"Skipping {directory}: {e}")
+        return subdirectories
@@ -0,0 +1,45 @@
+import json
+import os
+
+from core.paths import CONFIG_DIR, ensure_dir
+
+SETTINGS_PATH = os.path.join(CONFIG_DIR, "settings.json")
+
+DEFAULT_SETTINGS = {
+    # Seconds other make jobs may keep running after the first fatal error
+    "abort_grace_seconds": 5,
+    # Directories searched recursively for ROMs, in addition to the launch directory
+    "rom_search_roots": ["~/ROMs", "~/Emulation/roms", "~/Downloads"],
+    "rom_scan_max_depth": 4,
+    # Previous installs kept for `64all install rollback`
+    "install_generations_kept": 3,
+    # Disk budget for everything under the cache directories, see `64all cache stats`
+    "cache_budget_mb": 4096,
+    # Native builds compile through ccache, shared by all forks and regions
+    "use_ccache": True,
+}
+
+
+def load_settings(settings_path=SETTINGS_PATH):
+    """Return the user's settings merged over the defaults."""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(settings_path, "r") as file:
+            settings.update(json.load(file))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Error reading settings from {settings_path}: {e}")
+    return settings
+
+
+def get_setting(key, settings_path=SETTINGS_PATH):
+    return load_settings(settings_path)[key]
+
+
+def save_settings(settings, settings_path=SETTINGS_PATH):
+    ensure_dir(os.path.dirname(settings_path))
+    temp_path = f"{settings_path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(settings, file, indent=2)
+    os.replace(temp_path, settings_path)
@@ -0,0 +1,64 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """
+    Wall-clock timings of the startup phases, for ``--profile-startup``.
+
+    Phases may overlap (background tasks run concurrently with each other),
+    so each one is recorded with its start offset and duration. The report is
+    printed once every phase that was begun has ended.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self.open_phases = {}
+        self.phases = []
+        self.reported = False
+        self.lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def begin(self, name):
+        if not self.enabled or self.reported:
+            return
+        with self.lock:
+            self.open_phases.setdefault(name, time.perf_counter())
+
+    def end(self, name):
+        if not self.enabled or self.reported:
+            return
+        with self.lock:
+            started = self.open_phases.pop(name, None)
+            if started is None:
+                return
+            self.phases.append(
+                (name, started - self.origin, time.perf_counter() - started)
+            )
+            done = not self.open_phases
+        if done:
+            self.report()
+
+    @contextmanager
+    def phase(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def report(self):
+        self.reported = True
+        total = max(start + duration for _, start, duration in self.phases)
+        print("Startup profile (ms):")
+        print(f"  {'phase':<28} {'start':>8} {'duration':>9}")
+        for name, start, duration in sorted(self.phases, key=lambda p: p[1]):
+            print(f"  {name:<28} {start * 1000:>8.1f} {duration * 1000:>9.1f}")
+        print(f"  {'total':<28} {'':>8} {total * 1000:>9.1f}")
+
+
+profiler = StartupProfiler()
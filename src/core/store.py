@@ -0,0 +1,149 @@
+import os
+import tempfile
+from collections import namedtuple
+
+from core.installer import (
+    _UNSUPPORTED_ERRNOS,
+    copy_file,
+    file_hash,
+    hardlink_file,
+    reflink_file,
+)
+from core.paths import DATA_DIR, ensure_dir
+
+STORE_DIR = os.path.join(DATA_DIR, "store")
+# Smaller files aren't worth hashing and an extra link
+MIN_STORED_SIZE = 64 * 1024
+# Install strategy reported in InstallResult
+STORE = "store"
+
+StoreStats = namedtuple("StoreStats", "objects unique_bytes linked_bytes")
+
+
+class ContentStore:
+    """
+    Files shared by installs, stored once under their content hash.
+
+    Installs hardlink to the objects, so forks installed side by side with
+    the same assets and sound banks use the space only once. Objects are
+    read-only since every install shares the inode; executables are kept
+    apart from identical non-executable files because the mode is shared
+    too. An object with a link count of 1 is used by no install anymore.
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+
+    def object_path(self, content_hash, executable):
+        suffix = "x" if executable else ""
+        return os.path.join(
+            self.root, "objects", content_hash[:2], content_hash[2:] + suffix
+        )
+
+    def usable_for(self, directory):
+        """Hardlinks only work within a filesystem."""
+        try:
+            return os.stat(ensure_dir(self.root)).st_dev == os.stat(directory).st_dev
+        except OSError:
+            return False
+
+    def add(self, path, consume=False):
+        """Put a file in the store. Returns (object path, content hash)."""
+        content_hash = file_hash(path)
+        executable = bool(os.stat(path).st_mode & 0o111)
+        object_path = self.object_path(content_hash, executable)
+        if os.path.exists(object_path):
+            return object_path, content_hash
+
+        # A temp name of its own: installs run in several threads
+        fd, temp_path = tempfile.mkstemp(
+            dir=ensure_dir(os.path.dirname(object_path)), suffix=".tmp"
+        )
+        os.close(fd)
+        try:
+            try:
+                # A kept file is copied, not linked: the chmod below would
+                # make the caller's file read-only too
+                (os.rename if consume else reflink_file)(path, temp_path)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                copy_file(path, temp_path)
+            os.chmod(temp_path, 0o555 if executable else 0o444)
+            os.replace(temp_path, object_path)
+        except BaseException:
+            if os.path.lexists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return object_path, content_hash
+
+    def install_files(self, pairs, consume_source=False):
+        """
+        Install (source, target) pairs by linking them to store objects.
+
+        Returns ({target: content hash} of the stored files, the pairs left
+        for a regular install: small files, symlinks, and everything after
+        linking turned out not to work).
+        """
+        stored = {}
+        remaining = []
+        for index, (source, target) in enumerate(pairs):
+            if os.path.islink(source) or os.path.getsize(source) < MIN_STORED_SIZE:
+                remaining.append((source, target))
+                continue
+            try:
+                object_path, content_hash = self.add(source, consume_source)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                hardlink_file(object_path, target)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                if not os.path.exists(source):
+                    # Already moved into the store
+                    copy_file(object_path, target)
+                    os.chmod(target, os.stat(target).st_mode | 0o200)
+                    stored[target] = content_hash
+                else:
+                    remaining.append((source, target))
+                remaining.extend(pairs[index + 1 :])
+                break
+            stored[target] = content_hash
+        return stored, remaining
+
+    def objects(self):
+        """Yield (object path, stat result) for every object."""
+        objects_dir = os.path.join(self.root, "objects")
+        for directory, _, filenames in os.walk(objects_dir):
+            for name in filenames:
+                if name.endswith((".tmp", ".64all-tmp")):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    yield path, os.lstat(path)
+                except FileNotFoundError:
+                    continue
+
+    def stats(self):
+        """
+        What the store holds: ``unique_bytes`` is the disk space it really
+        uses, ``linked_bytes`` what the installs would use without it.
+        """
+        objects = unique_bytes = linked_bytes = 0
+        for _, stat_result in self.objects():
+            objects += 1
+            unique_bytes += stat_result.st_size
+            linked_bytes += stat_result.st_size * max(0, stat_result.st_nlink - 1)
+        return StoreStats(objects, unique_bytes, linked_bytes)
+
+    def gc(self):
+        """Delete objects no install links to anymore. Returns (count, bytes)."""
+        count = freed = 0
+        for path, stat_result in self.objects():
+            if stat_result.st_nlink == 1:
+                os.unlink(path)
+                count += 1
+                freed += stat_result.st_size
+        return count, freed
+
+
+store = ContentStore()
@@ -0,0 +1,138 @@
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+from core.paths import CACHE_DIR, ensure_dir
+
+TRASH_SUFFIX = ".64all-trash"
+# Trashed paths not deleted yet, so a later session can finish the job
+PENDING_PATH = os.path.join(CACHE_DIR, "trash.json")
+
+
+def _lower_priority():
+    """Make the calling thread yield the CPU to everything else (Linux: per-thread nice)."""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
+
+
+def _delete(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.unlink(path)
+
+
+class Trash:
+    """
+    Deletes directory trees without making the caller wait.
+
+    ``move`` renames the path aside (instant, as it stays on the same
+    filesystem) so the original location can be reused right away, and a
+    low-priority background thread removes it. The thread is a daemon:
+    whatever it doesn't finish is picked up by ``purge_leftovers`` on the
+    next start.
+    """
+
+    def __init__(self, pending_path=PENDING_PATH):
+        self.pending_path = pending_path
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.thread = None
+
+    def move(self, path):
+        """Trash a file or directory. Returns the path it was moved to, or None."""
+        if not os.path.lexists(path):
+            return None
+        path = os.path.abspath(path)
+        directory, name = os.path.split(path.rstrip(os.sep))
+        trash_path = os.path.join(
+            directory, f".{name}.{os.getpid()}-{time.monotonic_ns()}{TRASH_SUFFIX}"
+        )
+        try:
+            os.rename(path, trash_path)
+        except OSError as e:
+            # E.g. a mount point; deleting in place is all we can do
+            print(f"Could not move {path} aside ({e}), deleting it now")
+            _delete(path)
+            return None
+        self._set_pending(trash_path, True)
+        self._enqueue(trash_path)
+        return trash_path
+
+    def purge_leftovers(self, scan_dirs=()):
+        """Queue trash left behind by earlier sessions for deletion."""
+        with self.lock:
+            leftovers = set(self._read_pending())
+        for directory in scan_dirs:
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                continue
+            leftovers.update(
+                os.path.join(directory, name)
+                for name in names
+                if name.endswith(TRASH_SUFFIX)
+            )
+        for path in sorted(leftovers):
+            if os.path.lexists(path):
+                self._enqueue(path)
+            else:
+                self._set_pending(path, False)
+        return len(leftovers)
+
+    def wait(self):
+        """Block until everything trashed so far has been deleted."""
+        self.queue.join()
+
+    def _enqueue(self, path):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self._run, name="trash", daemon=True
+                )
+                self.thread.start()
+        self.queue.put(path)
+
+    def _run(self):
+        _lower_priority()
+        while True:
+            path = self.queue.get()
+            try:
+                _delete(path)
+                self._set_pending(path, False)
+            except OSError as e:
+                print(f"Error deleting {path}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _read_pending(self):
+        try:
+            with open(self.pending_path, "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            print(f"Error reading {self.pending_path}: {e}")
+            return []
+
+    def _set_pending(self, path, pending):
+        with self.lock:
+            paths = [p for p in self._read_pending() if p != path]
+            if pending:
+                paths.append(path)
+            try:
+                ensure_dir(os.path.dirname(self.pending_path))
+                temp_path = f"{self.pending_path}.tmp"
+                with open(temp_path, "w") as file:
+                    json.dump(paths, file)
+                os.replace(temp_path, self.pending_path)
+            except OSError as e:
+                print(f"Error writing {self.pending_path}: {e}")
+
+
+trash = Trash()
@@ -1,15 +1,212 @@
+import argparse
 import sys
 
-from PyQt6.QtWidgets import QApplication
 
-from core.distrobox import cleanup_ubuntu_image
-from ui.primary_window import Sixty4All
-from ui.signal_connections import connect_signals
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="64All", description="Build and install Super Mario 64 PC ports."
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print how long each startup phase took",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    logs_parser = subparsers.add_parser("logs", help="Inspect past build logs")
+    logs_subparsers = logs_parser.add_subparsers(dest="logs_command", required=True)
+    logs_subparsers.add_parser("list", help="List recorded builds")
+    search_parser = logs_subparsers.add_parser(
+        "search", help="Search past build logs (case-insensitive)"
+    )
+    search_parser.add_argument("pattern", help='Text to look for, e.g. "error:"')
+    search_parser.add_argument("--repo", help="Only search builds of this repo")
+    search_parser.add_argument("--limit", type=int, default=200)
+
+    install_parser = subparsers.add_parser(
+        "install", help="Manage the generations of an install directory"
+    )
+    install_subparsers = install_parser.add_subparsers(
+        dest="install_command", required=True
+    )
+    list_parser = install_subparsers.add_parser(
+        "list", help="List the kept generations"
+    )
+    list_parser.add_argument("install_dir")
+    rollback_parser = install_subparsers.add_parser(
+        "rollback", help="Switch back to an earlier generation"
+    )
+    rollback_parser.add_argument("install_dir")
+    rollback_parser.add_argument(
+        "generation",
+        type=int,
+        nargs="?",
+        help="Defaults to the one before the active one",
+    )
+
+    cache_parser = subparsers.add_parser("cache", help="Inspect and trim the caches")
+    cache_subparsers = cache_parser.add_subparsers(dest="cache_command", required=True)
+    cache_subparsers.add_parser("stats", help="Show the size of each cache")
+    gc_parser = cache_subparsers.add_parser(
+        "gc", help="Evict least recently used entries until the caches fit the budget"
+    )
+    gc_parser.add_argument(
+        "--budget-mb", type=int, help="Defaults to the cache_budget_mb setting"
+    )
+    gc_parser.add_argument(
+        "--dry-run", action="store_true", help="Only show what would be evicted"
+    )
+
+    store_parser = subparsers.add_parser(
+        "store", help="Inspect the store of files shared between installs"
+    )
+    store_subparsers = store_parser.add_subparsers(dest="store_command", required=True)
+    store_subparsers.add_parser("stats", help="Show how much space sharing saves")
+    store_subparsers.add_parser("gc", help="Delete files no install uses anymore")
+
+    # Anything we don't know about is left for Qt (-platform, -style, ...)
+    return parser.parse_known_args(argv)
+
+
+def run_logs_command(args):
+    from core.buildlog import list_logs, search_logs
+
+    if args.logs_command == "list":
+        for index in list_logs():
+            print(
+                f"{index['build_id']}  {index['status']:<12} "
+                f"{index['line_count']:>8} lines  {index['repo']}"
+            )
+        return 0
+
+    matches = search_logs(args.pattern, repo=args.repo, limit=args.limit)
+    for match in matches:
+        print(f"{match.build_id}:{match.line_number}: {match.text}")
+    return 0 if matches else 1
+
+
+def run_install_command(args):
+    import time
+
+    from core.generations import GenerationError, list_generations, rollback
+
+    if args.install_command == "list":
+        generations = list_generations(args.install_dir)
+        for generation in generations:
+            created = time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(generation.created)
+            )
+            marker = "*" if generation.active else " "
+            print(f"{marker} {generation.number:>4}  {created}  {generation.path}")
+        return 0 if generations else 1
+
+    try:
+        number = rollback(args.install_dir, args.generation)
+    except GenerationError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"{args.install_dir} now points to generation {number}")
+    return 0
+
+
+def run_cache_command(args):
+    import time
+
+    from core.cache_manager import cache_manager
+    from core.installer import format_size
+    from core.settings import get_setting
+    from core.trash import trash
+
+    if args.cache_command == "stats":
+        stats = cache_manager.stats()
+        for cache, (count, size, oldest) in stats.items():
+            last_used = (
+                time.strftime("%Y-%m-%d", time.localtime(oldest)) if oldest else "-"
+            )
+            print(
+                f"{cache:<12} {count:>6} entries {format_size(size):>11}  oldest {last_used}"
+            )
+        total = sum(size for _, size, _ in stats.values())
+        budget = get_setting("cache_budget_mb") * 1024 * 1024
+        print(
+            f"{'total':<12} {'':>14} {format_size(total):>11}  budget {format_size(budget)}"
+        )
+        return 0
+
+    budget = args.budget_mb * 1024 * 1024 if args.budget_mb is not None else None
+    evicted = cache_manager.gc(budget, dry_run=args.dry_run)
+    for entry in evicted:
+        print(
+            f"{'Would evict' if args.dry_run else 'Evicted'} {entry.cache}/{entry.key} ({format_size(entry.size)})"
+        )
+    freed = format_size(sum(entry.size for entry in evicted))
+    print(f"{freed} {'would be freed' if args.dry_run else 'freed'}")
+    trash.wait()
+    return 0
+
+
+def run_store_command(args):
+    from core.installer import format_size
+    from core.store import store
+
+    if args.store_command == "stats":
+        stats = store.stats()
+        print(f"objects       {stats.objects:>10}")
+        print(f"unique        {format_size(stats.unique_bytes):>10}")
+        print(f"in installs   {format_size(stats.linked_bytes):>10}")
+        print(
+            f"saved         {format_size(max(0, stats.linked_bytes - stats.unique_bytes)):>10}"
+        )
+        return 0
+
+    count, freed = store.gc()
+    print(f"Deleted {count} unused objects, {format_size(freed)} freed")
+    return 0
+
+
+def run_gui(qt_argv):
+    from core.startup_profile import profiler
+
+    profiler.begin("first window")
+    with profiler.phase("imports"):
+        from PyQt6.QtCore import QTimer
+        from PyQt6.QtWidgets import QApplication
+
+        from ui.primary_window import Sixty4All
+        from ui.signal_connections import connect_signals
+
+    with profiler.phase("QApplication"):
+        app = QApplication(qt_argv)
+    with profiler.phase("main window"):
+        window = Sixty4All()
+        connect_signals(window)
+        window.show()
+
+    # Runs once the event loop has processed the show; the slow parts of
+    # startup (repo configs, branch list, ROM scan) then fill in the UI
+    QTimer.singleShot(0, window.start_background_tasks)
+    QTimer.singleShot(0, lambda: profiler.end("first window"))
+    return app.exec()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args, qt_args = parse_args(argv)
+
+    if args.command == "logs":
+        return run_logs_command(args)
+    if args.command == "install":
+        return run_install_command(args)
+    if args.command == "cache":
+        return run_cache_command(args)
+    if args.command == "store":
+        return run_store_command(args)
+    if args.profile_startup:
+        from core.startup_profile import profiler
+
+        profiler.enable()
+    return run_gui([sys.argv[0]] + qt_args)
+
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    app.aboutToQuit.connect(cleanup_ubuntu_image)
-    window = Sixty4All()
-    connect_signals(window)
-    window.show()
-    sys.exit(app.exec())
+    sys.exit(main())
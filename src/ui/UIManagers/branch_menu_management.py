@@ -0,0 +1,71 @@
+from PyQt6.QtCore import QObject, QThread
+
+from core.gitlogic import BranchListWorker, default_branch
+from core.startup_profile import profiler
+
+
+class BranchMenuManager(QObject):
+    """Fills the branch menu from ``git ls-remote`` without blocking the UI."""
+
+    def __init__(self, ui_setup):
+        super().__init__(ui_setup.parent)
+        self.ui_setup = ui_setup
+        self.thread = None
+        self.worker = None
+        self.requested_url = None
+        self.branches = {}
+
+    def refresh(self, repo_url):
+        self.requested_url = repo_url
+        branch_menu = self.ui_setup.branch_menu
+        branch_menu.clear()
+        if repo_url in self.branches:
+            self.fill_menu(self.branches[repo_url])
+            return
+
+        # Building with no branch selected clones the remote's default branch
+        branch_menu.setPlaceholderText("Loading branches...")
+        branch_menu.setEnabled(False)
+        if self.thread is None:
+            self.run_worker(repo_url)
+
+    def run_worker(self, repo_url):
+        profiler.begin("branch list")
+        self.thread = QThread()
+        self.worker = BranchListWorker(repo_url)
+        self.worker.moveToThread(self.thread)
+        self.worker.finished_signal.connect(self.on_branches_listed)
+        self.thread.started.connect(self.worker.run)
+        self.thread.start()
+
+    def on_branches_listed(self, repo_url, branches):
+        self.thread.quit()
+        self.thread.wait()
+        self.thread.deleteLater()
+        self.worker.deleteLater()
+        self.thread = None
+        self.worker = None
+        profiler.end("branch list")
+
+        if branches:
+            print(f"Branches found: {branches}\n")
+            self.branches[repo_url] = branches
+        if repo_url == self.requested_url:
+            self.fill_menu(branches)
+        elif self.requested_url is not None:
+            # The selection changed while ls-remote was running
+            self.refresh(self.requested_url)
+
+    def fill_menu(self, branches):
+        branch_menu = self.ui_setup.branch_menu
+        branch_menu.clear()
+        branch_menu.addItems(branches)
+        branch_menu.setCurrentText(default_branch(branches))
+        branch_menu.setPlaceholderText("Default branch")
+        branch_menu.setEnabled(True)
+
+    def cleanup(self):
+        self.requested_url = None
+        if self.thread is not None:
+            self.thread.quit()
+            self.thread.wait()
@@ -1,15 +1,43 @@
-import html
-import re
 from PyQt6.QtCore import QTimer
-from PyQt6.QtGui import QTextCursor
+from PyQt6.QtGui import QFont, QTextCharFormat, QTextCursor
+
+from core.ansi import AnsiStreamParser, is_progress_update, merge_runs, strip_ansi
+from core.logspool import LogSpool
+
 
 class OutputTextManager:
+    FLUSH_THRESHOLD = 4096
+    # The widget only ever holds this many lines; everything is spooled to disk
+    MAX_VISIBLE_LINES = 5000
+    PAGE_LINES = 500
+
     def __init__(self, output_text, color_manager):
         self.output_text = output_text
         self.color_manager = color_manager
-        self.text_buffer = ""
+        self.parser = AnsiStreamParser()
+        self.spool = LogSpool()
+        self.pending_runs = []
+        self.pending_lines = 0
+        self.pending_size = 0
+        self.char_formats = {}
+        self.char_formats_color_map = None
+        self.build_log = None
+
+        # The last line without escapes, the style it started with and where
+        # its runs begin in pending_runs (None once flushed), so a progress
+        # update can replace it
         self.last_line = ""
-        self.color_pattern = re.compile(r'\[(\d+)m')
+        self.last_line_style = self.parser.style
+        self.last_line_runs = None
+
+        # Spool line range currently shown in the widget
+        self.window_start = 0
+        self.window_end = 0
+        # True while the widget shows the tail of the log and receives new lines
+        self.live = True
+        self.paging = False
+
+        self.output_text.verticalScrollBar().valueChanged.connect(self.on_scroll)
         self.setup_update_timer()
 
     def setup_update_timer(self):
@@ -18,46 +46,204 @@ class OutputTextManager:
         self.update_timer.start(100)
 
     def update_output_text(self, text):
-        text = re.sub(r'\r(?!\n)', '\n', text)
-        lines = text.split('\n')
+        # Every call is a complete line (or several)
+        text = text.replace("\r\n", "\n")
+        if text.endswith("\n"):
+            text = text[:-1]
 
-        for line in lines:
-            line = re.sub(r'(?<!\[)\s*\[(?!\d+m)|\](?!\s*\[)\s*', '', line)
-            
-            if self.last_line and line.startswith(self.last_line.rstrip()):
-                self.text_buffer = self.text_buffer[:-len(self.last_line)] + line + '\n'
-            else:
-                self.text_buffer += line + '\n'
+        for line in text.split("\n"):
+            # A terminal only shows what the last carriage return left
+            line = next((part for part in reversed(line.split("\r")) if part), "")
+            plain_line = strip_ansi(line)
+            if is_progress_update(self.last_line, plain_line):
+                self.remove_last_line()
+            self.last_line = plain_line
+            self.last_line_style = self.parser.style
 
-            self.last_line = line
+            self.spool.append(line, self.parser.style)
+            if self.build_log:
+                self.build_log.write_line(line)
+            runs = self.parser.feed(line + "\n")
+            if self.live:
+                self.last_line_runs = len(self.pending_runs)
+                self.pending_runs.extend(runs)
+                self.pending_lines += 1
+                self.pending_size += len(line) + 1
 
-        if len(self.text_buffer) > 4096:
+        if self.pending_size > self.FLUSH_THRESHOLD:
             self.flush_text_buffer()
 
+    def remove_last_line(self):
+        """Take back the last line, which the next one replaces."""
+        shown = self.live and self.window_end == self.spool.line_count
+        self.spool.remove_last()
+        self.parser.reset(self.last_line_style)
+        if self.last_line_runs is not None:
+            del self.pending_runs[self.last_line_runs :]
+            self.pending_lines -= 1
+            self.last_line_runs = None
+        elif shown and self.window_end > self.window_start:
+            self.paging = True
+            self.remove_last_lines(1)
+            self.window_end -= 1
+            self.paging = False
+
+    def attach_build_log(self, build_log):
+        """Mirror every following line into a persistent BuildLog (or stop with None)."""
+        self.build_log = build_log
+
     def flush_text_buffer(self):
-        if not self.text_buffer:
+        if not self.pending_runs:
             return
 
-        cursor = self.output_text.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
+        runs = merge_runs(self.pending_runs)
+        line_count = self.pending_lines
+        self.pending_runs = []
+        self.last_line_runs = None
+        self.pending_lines = 0
+        self.pending_size = 0
+
+        scrollbar = self.output_text.verticalScrollBar()
+        follow = scrollbar.value() >= scrollbar.maximum() - 4
+
+        self.paging = True
+        self.insert_runs(runs, QTextCursor.MoveOperation.End)
+        self.window_end += line_count
+        self.trim_top(follow)
+        if follow:
+            scrollbar.setValue(scrollbar.maximum())
+        self.paging = False
+
+    def scroll_to_line(self, line_number):
+        """Scroll so that a line of the log is at the top of the view, if it's shown."""
+        self.flush_text_buffer()
+        if not self.window_start <= line_number < self.window_end:
+            return
+        document = self.output_text.document()
+        block = document.findBlockByNumber(line_number - self.window_start)
+        top = document.documentLayout().blockBoundingRect(block).top()
+        self.paging = True
+        self.output_text.verticalScrollBar().setValue(int(top))
+        self.paging = False
+
+    def on_scroll(self, value):
+        if self.paging:
+            return
+        scrollbar = self.output_text.verticalScrollBar()
+        if value == scrollbar.minimum() and self.window_start > 0:
+            self.page_in_older()
+        elif value == scrollbar.maximum() and not self.live:
+            self.page_in_newer()
+
+    def page_in_older(self):
+        """Load the page of lines just above the window from the spool."""
+        self.flush_text_buffer()
+        self.paging = True
+
+        count = min(self.PAGE_LINES, self.window_start)
+        start = self.window_start - count
+        scrollbar = self.output_text.verticalScrollBar()
+        old_maximum, old_value = scrollbar.maximum(), scrollbar.value()
+
+        self.insert_runs(
+            self.render_lines(start, count), QTextCursor.MoveOperation.Start
+        )
+        self.window_start = start
+        # Keep the same text under the viewport
+        scrollbar.setValue(old_value + scrollbar.maximum() - old_maximum)
+
+        excess = self.window_end - self.window_start - self.MAX_VISIBLE_LINES
+        if excess > 0:
+            self.remove_last_lines(excess)
+            self.window_end -= excess
+            self.live = False
+
+        self.paging = False
+
+    def page_in_newer(self):
+        """Load the page of lines just below the window from the spool."""
+        self.paging = True
+
+        count = min(self.PAGE_LINES, self.spool.line_count - self.window_end)
+        self.insert_runs(
+            self.render_lines(self.window_end, count), QTextCursor.MoveOperation.End
+        )
+        self.window_end += count
+        self.live = self.window_end == self.spool.line_count
+        self.trim_top(follow=False)
+
+        self.paging = False
+
+    def trim_top(self, follow):
+        excess = self.window_end - self.window_start - self.MAX_VISIBLE_LINES
+        if excess <= 0:
+            return
+
+        scrollbar = self.output_text.verticalScrollBar()
+        old_maximum, old_value = scrollbar.maximum(), scrollbar.value()
+        cursor = QTextCursor(self.output_text.document())
+        cursor.movePosition(QTextCursor.MoveOperation.Start)
+        cursor.movePosition(
+            QTextCursor.MoveOperation.NextBlock, QTextCursor.MoveMode.KeepAnchor, excess
+        )
+        cursor.removeSelectedText()
+        self.window_start += excess
+
+        if not follow:
+            scrollbar.setValue(max(0, old_value - (old_maximum - scrollbar.maximum())))
+
+    def remove_last_lines(self, count):
+        # The document always ends with an empty block after the last newline
+        document = self.output_text.document()
+        block = document.findBlockByNumber(document.blockCount() - 1 - count)
+        cursor = QTextCursor(block)
+        cursor.movePosition(
+            QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor
+        )
+        cursor.removeSelectedText()
 
-        parts = re.split(r'(\[(?:\d+;)*\d+m)', self.text_buffer)
+    def render_lines(self, start, count):
+        """Re-parse spooled lines, starting from the style saved at the nearest checkpoint."""
+        first, style, lines = self.spool.read_lines(start, count)
+        parser = AnsiStreamParser(style) if style is not None else AnsiStreamParser()
+        runs = []
+        for line_number, line in enumerate(lines, first):
+            line_runs = parser.feed(line + "\n")
+            if line_number >= start:
+                runs.extend(line_runs)
+        return merge_runs(runs)
 
-        html_text = ""
-        current_color = self.color_manager.color_map["0"]
+    def insert_runs(self, runs, position):
+        cursor = QTextCursor(self.output_text.document())
+        cursor.movePosition(position)
+        cursor.beginEditBlock()
+        for text, style in runs:
+            cursor.insertText(text, self.char_format(style))
+        cursor.endEditBlock()
 
-        for part in parts:
-            if part.startswith('[') and part.endswith('m'):
-                color_code = part[1:-1].split(';')[-1]
-                current_color = self.color_manager.color_map.get(color_code, self.color_manager.color_map["0"])
-            else:
-                escaped_part = html.escape(part).replace('\n', '<br>')
-                html_text += f'<span style="color:{current_color.name()};">{escaped_part}</span>'
+    def char_format(self, style):
+        """Return a cached QTextCharFormat for a parser style."""
+        color_map = self.color_manager.color_map
+        if color_map is not self.char_formats_color_map:
+            # Theme changed, drop formats built from the old palette
+            self.char_formats = {}
+            self.char_formats_color_map = color_map
 
-        cursor.insertHtml(html_text)
-        self.output_text.setTextCursor(cursor)
-        self.output_text.ensureCursorVisible()
-        self.text_buffer = ""
+        char_format = self.char_formats.get(style)
+        if char_format is None:
+            foreground, bold = style
+            char_format = QTextCharFormat()
+            char_format.setForeground(
+                color_map.get(str(foreground), color_map["0"])
+                if foreground is not None
+                else color_map["0"]
+            )
+            if bold:
+                char_format.setFontWeight(QFont.Weight.Bold)
+            self.char_formats[style] = char_format
+        return char_format
 
     def cleanup(self):
-        self.update_timer.stop()
\ No newline at end of file
+        self.update_timer.stop()
+        self.flush_text_buffer()
+        self.spool.close()
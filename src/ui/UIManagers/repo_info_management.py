@@ -1,11 +1,15 @@
 import os
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPixmap
+from core.build_options import repo_options
 from ui.signal_connections import BASE_PATH
+from ui.thumbnails import ThumbnailCache
+
 
 class RepoInfoManager:
     def __init__(self, ui_setup):
         self.ui_setup = ui_setup
+        self.thumbnails = ThumbnailCache(parent=ui_setup.parent)
+        self.thumbnails.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.image_path = None
 
     def on_repo_selection(self):
         repo_name = self.ui_setup.repo_url_combobox.currentText()
@@ -13,11 +17,13 @@ class RepoInfoManager:
             return
 
         self.ui_setup.current_repo = repo_name
-        repo = next((repo for repo in self.ui_setup.parent.repo_manager.REPOS if repo["name"] == repo_name), None)
+        repo = self.ui_setup.parent.repo_manager.get_repo(repo_name)
         if repo:
             self.update_repo_info(repo)
             self.update_build_options(repo)
-            print(f"Selected repo: {repo_name}, Options: {self.ui_setup.parent.repo_options}")
+            print(
+                f"Selected repo: {repo_name}, Options: {self.ui_setup.parent.repo_options}"
+            )
         else:
             print(f"Repository {repo_name} not found in loaded repos.")
 
@@ -32,21 +38,26 @@ class RepoInfoManager:
         image_name = info.get("image", "")
         image_path = os.path.join(BASE_PATH, "config", "images", image_name)
 
-        if os.path.exists(image_path):
-            pixmap = QPixmap(image_path)
-            if not pixmap.isNull():
-                scaled_pixmap = pixmap.scaled(
-                    300, 200,
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                self.ui_setup.repo_image.setPixmap(scaled_pixmap)
+        if os.path.isfile(image_path):
+            self.image_path = image_path
+            # Decoded and scaled in the background unless it's already cached
+            pixmap = self.thumbnails.request(image_path)
+            if pixmap is not None:
+                self.ui_setup.repo_image.setPixmap(pixmap)
             else:
-                print(f"Failed to load image: {image_path}")
                 self.ui_setup.repo_image.clear()
         else:
             print(f"Image file not found: {image_path}")
+            self.image_path = None
+            self.ui_setup.repo_image.clear()
+
+    def on_thumbnail_ready(self, image_path, pixmap):
+        if image_path != self.image_path:
+            return  # Another repo was selected in the meantime
+        if pixmap.isNull():
             self.ui_setup.repo_image.clear()
+        else:
+            self.ui_setup.repo_image.setPixmap(pixmap)
 
     def update_repo_description(self, info):
         description = info.get("description", "No description available.")
@@ -55,7 +66,9 @@ class RepoInfoManager:
     def update_repo_trailer(self, info):
         trailer_link = info.get("trailer", "")
         if trailer_link:
-            self.ui_setup.repo_trailer.setText(f'<a href="{trailer_link}">Watch Trailer</a>')
+            self.ui_setup.repo_trailer.setText(
+                f'<a href="{trailer_link}">Watch Trailer</a>'
+            )
             self.ui_setup.repo_trailer.setOpenExternalLinks(True)
         else:
             self.ui_setup.repo_trailer.clear()
@@ -67,15 +80,30 @@ class RepoInfoManager:
 
         self.ui_setup.parent.build_dependencies = repo.get("dependencies", [])
 
-        from core.gitlogic import update_branch_menu
-        update_branch_menu(repo["name"], self.ui_setup.parent.repo_manager.REPOS, self.ui_setup.branch_menu)
-
-        self.ui_setup.parent.repo_options = {}
-        self.ui_setup.parent.build_manager.user_selections = {}
+        self.ui_setup.branch_menu_manager.refresh(repo.get("url"))
 
-        self.ui_setup.parent.repo_options = repo.get("options", {})
-        self.ui_setup.parent.build_manager.update_build_options(self.ui_setup.parent.repo_options)
+        # Each repo keeps its own option model, so earlier choices come back
+        self.ui_setup.parent.repo_options = repo_options(repo)
+        self.ui_setup.parent.build_manager.update_build_options(
+            self.ui_setup.parent.repo_options
+        )
 
         self.ui_setup.branch_combobox.setCurrentText(repo["name"])
 
-        self.ui_setup.update_advanced_options()
\ No newline at end of file
+    def reload_repo(self, old_repo, repo):
+        """Apply an edit to the selected repo's config, keeping the user's choices."""
+        old_repo = old_repo or {}
+        parent = self.ui_setup.parent
+        if old_repo.get("info") != repo.get("info"):
+            self.update_repo_info(repo)
+        parent.build_dependencies = repo.get("dependencies", [])
+        if old_repo.get("url") != repo.get("url"):
+            parent.repo_url = repo.get("url")
+            self.ui_setup.branch_menu_manager.refresh(repo.get("url"))
+
+        options = repo_options(repo)
+        if repo_options(old_repo) != options:
+            # The option model drops choices that are no longer offered
+            parent.repo_options = options
+            parent.build_manager.update_build_options(options)
+        print(f"Reloaded repo: {repo['name']}, Options: {parent.repo_options}")
@@ -1,40 +1,98 @@
 import os
 
-import yaml
+from PyQt6.QtCore import QFileSystemWatcher, QObject, QThread, QTimer, pyqtSignal
 from PyQt6.QtWidgets import QFileDialog
 
+from core.repo_registry import SNAPSHOT_NAME, RepoRegistry
+from core.startup_profile import profiler
 from ui.signal_connections import BASE_PATH
+from ui.uiutils import sync_combobox_items
+
+
+class RepoLoadWorker(QObject):
+    finished_signal = pyqtSignal(object)
+
+    def __init__(self, registry):
+        super().__init__()
+        self.registry = registry
+
+    def run(self):
+        try:
+            self.registry.load()
+        except Exception as e:
+            print(f"Error loading repo configurations: {e}")
+        self.finished_signal.emit(self.registry)
 
 
 class RepoManager:
+    RELOAD_DELAY_MS = 300
+
     def __init__(self, parent):
         self.parent = parent
         self.REPOS = []
+        self.registry = None
+        self.thread = None
+        self.worker = None
+        self.watcher = None
+        self.reload_timer = None
 
-    def load_repos(self):
+    @staticmethod
+    def create_registry():
         config_dir = os.path.join(BASE_PATH, "config", "repos")
         if not os.path.exists(config_dir):
             print(
                 f"The repos directory was not found at {config_dir}. Please make sure it exists."
             )
+            return None
+        # Generated by scripts/build.sh for the frozen build
+        bundled_snapshot = os.path.join(BASE_PATH, "config", SNAPSHOT_NAME)
+        return RepoRegistry(config_dir, bundled_snapshot_path=bundled_snapshot)
+
+    def get_repo(self, name):
+        return self.registry.get(name) if self.registry else None
+
+    def load_repos(self):
+        registry = self.create_registry()
+        if registry is None:
             return
+        registry.load()
+        self.set_registry(registry)
 
-        self.REPOS = []
-        for filename in os.listdir(config_dir):
-            if filename.endswith(".yaml"):
-                file_path = os.path.join(config_dir, filename)
-                try:
-                    with open(file_path, "r") as file:
-                        repo_data = yaml.safe_load(file)
-                        if isinstance(repo_data, list):
-                            self.REPOS.extend(repo_data)
-                        elif isinstance(repo_data, dict):
-                            self.REPOS.append(repo_data)
-                        else:
-                            print(f"Invalid data structure in {filename}")
-                except Exception as e:
-                    print(f"Error loading {filename}: {str(e)}")
+    def load_repos_async(self):
+        """Load the repo configs on a worker thread, then fill the repo menus."""
+        registry = self.create_registry()
+        if registry is None:
+            return
 
+        profiler.begin("repo configs")
+        self.thread = QThread()
+        self.worker = RepoLoadWorker(registry)
+        self.worker.moveToThread(self.thread)
+        self.worker.finished_signal.connect(self.on_repos_loaded)
+        self.thread.started.connect(self.worker.run)
+        self.thread.start()
+
+    def on_repos_loaded(self, registry):
+        self.thread.quit()
+        self.thread.wait()
+        self.thread.deleteLater()
+        self.worker.deleteLater()
+        self.thread = None
+        self.worker = None
+
+        self.set_registry(registry)
+        self.populate_repo_urls()
+        if self.REPOS:
+            self.parent.ui_setup.set_build_button_enabled(True)
+        self.start_watching()
+        profiler.end("repo configs")
+
+    def set_registry(self, registry):
+        self.registry = registry
+        self.REPOS = registry.repos
+        self.report_loaded()
+
+    def report_loaded(self):
         if not self.REPOS:
             print(
                 "No valid repository configurations were found in the repos directory."
@@ -42,31 +100,85 @@ class RepoManager:
         else:
             print(f"Total repos loaded: {len(self.REPOS)}")
 
-    def populate_repo_urls(self):
+    def populate_repo_urls(self, previous_repos=None):
+        """
+        Show the loaded repos in the repo menus.
+
+        The menus are diffed against the new list rather than rebuilt, so the
+        current selection survives a reload. ``previous_repos`` maps names to
+        the configs shown before, to detect edits to the selected repo.
+        """
         if not hasattr(self.parent, "ui_setup") or self.parent.ui_setup is None:
             print("UI setup not initialized yet. Skipping repo URL population.")
             return
 
-        self.parent.ui_setup.repo_url_combobox.blockSignals(True)
-        self.parent.ui_setup.branch_combobox.blockSignals(True)
+        ui_setup = self.parent.ui_setup
+        names = [repo["name"] for repo in self.REPOS]
+        for combobox in (ui_setup.repo_url_combobox, ui_setup.branch_combobox):
+            combobox.blockSignals(True)
+            sync_combobox_items(combobox, names)
+            if names and combobox.currentIndex() == -1:
+                combobox.setCurrentIndex(0)
+            combobox.blockSignals(False)
 
-        self.parent.ui_setup.repo_url_combobox.clear()
-        self.parent.ui_setup.branch_combobox.clear()
-        for repo in self.REPOS:
-            self.parent.ui_setup.repo_url_combobox.addItem(repo["name"])
-            self.parent.ui_setup.branch_combobox.addItem(repo["name"])
+        if not self.REPOS:
+            return
+        current = ui_setup.repo_url_combobox.currentText()
+        if current != ui_setup.current_repo:
+            ui_setup.on_repo_selection()
+        elif previous_repos and previous_repos.get(current) != self.get_repo(current):
+            ui_setup.repo_info_manager.reload_repo(
+                previous_repos.get(current), self.get_repo(current)
+            )
 
-        if self.REPOS:
-            self.parent.ui_setup.repo_url_combobox.setCurrentIndex(0)
-            self.parent.ui_setup.branch_combobox.setCurrentIndex(0)
+    def start_watching(self):
+        """Reload config/repos when a YAML file is added, edited or removed."""
+        if self.registry is None:
+            return
+        self.watcher = QFileSystemWatcher(self.parent)
+        self.watcher.directoryChanged.connect(self.schedule_reload)
+        self.watcher.fileChanged.connect(self.schedule_reload)
+        self.reload_timer = QTimer(self.parent)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.timeout.connect(self.reload_repos)
+        self.update_watched_files()
 
-        self.parent.ui_setup.repo_url_combobox.blockSignals(False)
-        self.parent.ui_setup.branch_combobox.blockSignals(False)
+    def update_watched_files(self):
+        config_dir = self.registry.config_dir
+        wanted = {config_dir} | {
+            os.path.join(config_dir, filename) for filename in self.registry.files
+        }
+        watched = set(self.watcher.directories()) | set(self.watcher.files())
+        if watched - wanted:
+            self.watcher.removePaths(list(watched - wanted))
+        # Editors that save by renaming drop the old watch, so re-add every time
+        if wanted - watched:
+            self.watcher.addPaths(list(wanted - watched))
 
-        if self.REPOS:
-            self.parent.ui_setup.on_repo_selection()
+    def schedule_reload(self, _path=None):
+        # Editors write files in several steps; reload once they are done
+        self.reload_timer.start(self.RELOAD_DELAY_MS)
+
+    def reload_repos(self):
+        previous_repos = dict(self.registry.by_name)
+        changed_files = self.registry.refresh()
+        self.update_watched_files()
+        if not changed_files:
+            return
+
+        print(f"Reloaded repo configs: {', '.join(sorted(changed_files))}")
+        self.REPOS = self.registry.repos
+        self.registry.save_snapshot()
+        self.populate_repo_urls(previous_repos)
 
     def browse_directory(self):
         directory = QFileDialog.getExistingDirectory(self.parent, "Select Directory")
         if directory:
             self.parent.ui_setup.install_dir_entry.setText(directory)
+
+    def cleanup(self):
+        if self.reload_timer is not None:
+            self.reload_timer.stop()
+        if self.thread is not None:
+            self.thread.quit()
+            self.thread.wait()
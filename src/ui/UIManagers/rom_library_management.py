@@ -0,0 +1,112 @@
+from PyQt6.QtCore import QFileSystemWatcher, QObject, QThread, QTimer, pyqtSignal
+
+from core.romlibrary import RomLibrary
+from core.startup_profile import profiler
+
+
+class RomScanWorker(QObject):
+    finished_signal = pyqtSignal(bool)
+
+    def __init__(self, library, directories=None):
+        super().__init__()
+        self.library = library
+        self.directories = directories
+
+    def run(self):
+        try:
+            if self.directories is None:
+                changed = self.library.refresh()
+            else:
+                changed = False
+                for directory in self.directories:
+                    changed = self.library.scan_directory(directory) or changed
+        except Exception as e:
+            print(f"Error scanning for ROMs: {e}")
+            changed = False
+        self.finished_signal.emit(changed)
+
+
+class RomLibraryManager(QObject):
+    """Keeps the ROM library up to date in the background."""
+
+    roms_changed = pyqtSignal()
+    # inotify watches are a limited per-user resource
+    MAX_WATCHED_DIRECTORIES = 1000
+    RESCAN_DELAY_MS = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.library = RomLibrary()
+        self.thread = None
+        self.worker = None
+        self.pending_directories = set()
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        self.rescan_timer = QTimer(self)
+        self.rescan_timer.setSingleShot(True)
+        self.rescan_timer.timeout.connect(self.rescan_pending)
+
+    def start(self):
+        """Watch the last known directories right away and refresh the index in the background."""
+        self.update_watched_directories()
+        profiler.begin("ROM library scan")
+        self.run_worker(None)
+
+    def roms(self):
+        return self.library.roms()
+
+    def run_worker(self, directories):
+        if self.thread is not None:
+            if directories:
+                self.pending_directories.update(directories)
+            return
+
+        self.thread = QThread()
+        self.worker = RomScanWorker(self.library, directories)
+        self.worker.moveToThread(self.thread)
+        self.worker.finished_signal.connect(self.on_scan_finished)
+        self.thread.started.connect(self.worker.run)
+        self.thread.start()
+
+    def on_scan_finished(self, changed):
+        self.thread.quit()
+        self.thread.wait()
+        self.thread.deleteLater()
+        self.worker.deleteLater()
+        self.thread = None
+        self.worker = None
+        profiler.end("ROM library scan")
+
+        self.update_watched_directories()
+        if changed:
+            self.roms_changed.emit()
+        if self.pending_directories:
+            self.rescan_timer.start(self.RESCAN_DELAY_MS)
+
+    def on_directory_changed(self, directory):
+        # Coalesce bursts of events (e.g. a file being copied in)
+        self.pending_directories.add(directory)
+        self.rescan_timer.start(self.RESCAN_DELAY_MS)
+
+    def rescan_pending(self):
+        if self.thread is not None:
+            return
+        directories, self.pending_directories = sorted(self.pending_directories), set()
+        self.run_worker(directories)
+
+    def update_watched_directories(self):
+        wanted = set(sorted(self.library.directories)[: self.MAX_WATCHED_DIRECTORIES])
+        watched = set(self.watcher.directories())
+        if watched - wanted:
+            self.watcher.removePaths(list(watched - wanted))
+        if wanted - watched:
+            self.watcher.addPaths(list(wanted - watched))
+
+    def cleanup(self):
+        self.rescan_timer.stop()
+        if self.thread is not None:
+            # The scan is a plain loop, quit() alone wouldn't stop it
+            self.library.cancelled.set()
+            self.thread.quit()
+            self.thread.wait()
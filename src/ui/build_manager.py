@@ -1,67 +1,266 @@
 import os
-import shutil
 
-import yaml
-from PyQt6.QtCore import QUrl, Qt
+from PyQt6.QtCore import QTimer, QUrl, Qt
 from PyQt6.QtGui import QDesktopServices
 from PyQt6.QtWidgets import QWidget, QCheckBox, QSpinBox, QComboBox
 
-from core.distrobox import run_ephemeral_command
-from src.core.buildlogic import symlink_file_to_dir
-from ui.signal_connections import BASE_PATH
+from core.asset_packs import AssetPackFetcher, configured_packs, link_pack
+from core.asset_cache import cache_key, save_workspace, seed_workspace
+from core.build_progress import CompileProgressEstimator, with_object_count
+from core.buildlog import BuildLog
+from core.cache_manager import (
+    BuildLock,
+    CCACHE_DIR,
+    CONTAINER_IMAGES,
+    IMAGES,
+    cache_manager,
+    ccache_max_size_mb,
+)
+from core.diagnostics import FailureDetector, format_diagnostic
+from core.generations import install_generation
+from core.romfinder import N64RomValidator
+from core.romformat import materialize_z64
+from core.settings import get_setting
+from core.trash import trash
+from core.buildlogic import (
+    ccache_make_args,
+    find_build_dir,
+    region_build_command,
+    symlink_file_to_dir,
+    variant_make_args,
+    with_ccache,
+)
 
 
 class BuildManager:
+    # How often the install checks whether the asset packs are ready
+    ASSET_PACK_POLL_MS = 250
+
     def __init__(self, parent):
         self.parent = parent
         self.user_selections = {}
         self.build_process = None
+        self.build_log = None
+        self.progress_estimator = None
+        self.failure_detector = None
+        self.build_aborted = False
+        self.asset_cache_key = None
+        self.build_regions = []
+        self.asset_packs = None
+        # Keeps cache gc away from what the build uses
+        self.build_lock = BuildLock()
+
+    def begin_build_log(self, repo_name):
+        """
+        Start recording everything shown in the output view to a persistent
+        log. Also marks the build as running until finish_build_log.
+        """
+        self.finish_build_log("interrupted")
+        self.build_lock.acquire()
+        self.build_log = BuildLog(repo_name)
+        self.parent.ui_setup.output_text_manager.attach_build_log(self.build_log)
+
+    def finish_build_log(self, status):
+        self.build_lock.release()
+        if self.build_log is None:
+            return
+        self.parent.ui_setup.output_text_manager.attach_build_log(None)
+        self.build_log.close(status)
+        self.build_log = None
 
     def start_building(self):
-        symlink_file_to_dir(
-            self.parent.rom_dir,
-            self.parent.workspace,
-            f"baserom.{self.parent.rom_region}.z64",
-        )
+        # Pulls in asyncio and the distro detection, only needed once Build is clicked
+        from core.distrobox import run_ephemeral_command
+
+        # So the cache budget evicts the container image last if it's in use
+        cache_manager.record_access(IMAGES, CONTAINER_IMAGES[0])
+
+        # Every selected region is built from the same clone
+        rom_regions = self.parent.rom_regions or {
+            self.parent.rom_region: self.parent.rom_dir
+        }
+        regions = list(rom_regions)
+        rom_sha1s = []
+        for region, rom_dir in rom_regions.items():
+            # The build tools only understand big-endian ROMs
+            rom_sha1 = N64RomValidator.KNOWN_HASHES[region]
+            rom_path = materialize_z64(rom_dir, rom_sha1)
+            symlink_file_to_dir(
+                rom_path, self.parent.workspace, f"baserom.{region}.z64"
+            )
+            rom_sha1s.append(rom_sha1)
+        self.seed_assets("+".join(sorted(rom_sha1s)))
         print(self.parent.build_dependencies)
 
-        command = "make -j$(nproc) " + " ".join(
-            [f"{k}={v}" for k, v in self.user_selections.items()]
+        # The region is chosen by the ROM, not by an option; special options
+        # (asset packs) are handled by 64All itself
+        options = self.parent.repo_options
+        make_args = " ".join(
+            [
+                f"{k}={v}"
+                for k, v in self.user_selections.items()
+                if k != "VERSION" and not options.get(k, {}).get("special")
+            ]
         )
+        additional_packages = list(self.parent.build_dependencies)
+        use_ccache = get_setting("use_ccache") and self.get_build_target() == "Linux"
+        if use_ccache:
+            # Cross builds pick their own CC, so only native builds go through ccache
+            make_args = f"{make_args} {ccache_make_args()}".strip()
+            additional_packages.append("ccache")
+        command = region_build_command(regions, make_args)
+
+        repo_name = self.parent.ui_setup.repo_url_combobox.currentText()
+        history_name = (
+            repo_name if len(regions) == 1 else f"{repo_name} [{'+'.join(regions)}]"
+        )
+        self.progress_estimator = CompileProgressEstimator(history_name)
+        if self.progress_estimator.expected_objects is None:
+            # First build of this repo: count the objects with a dry run
+            command = with_object_count(
+                command, [variant_make_args(region, make_args) for region in regions]
+            )
+        if use_ccache:
+            command = with_ccache(command, CCACHE_DIR, ccache_max_size_mb())
+        self.build_regions = regions
+        self.parent.ui_setup.update_build_progress(0, None)
+        self.failure_detector = FailureDetector()
+        self.build_aborted = False
 
         run_ephemeral_command(
             command,
             ui_setup=self.parent.ui_setup,
             directory=self.parent.workspace,
-            additional_packages=self.parent.build_dependencies,
+            additional_packages=additional_packages,
             on_complete=self.build_finished,
+            on_output=self.on_build_output,
+            on_started=self.set_build_process,
         )
 
+    def start_asset_packs(self, repo):
+        """Start preparing the asset packs the repo's special options enable."""
+        packs = configured_packs(repo, self.user_selections)
+        self.asset_packs = AssetPackFetcher(packs) if packs else None
+        for pack in packs:
+            self.parent.ui_setup.output_text_manager.update_output_text(
+                f"Fetching {pack.name} from {pack.url} in the background\n"
+            )
+
+    def install_asset_packs(self, install_dir, packs):
+        res_dir = os.path.join(install_dir, "res")
+        for pack, source in packs:
+            try:
+                count = link_pack(source, res_dir, pack)
+            except OSError as e:
+                print(f"Error installing {pack.name}: {e}")
+                continue
+            self.parent.ui_setup.output_text_manager.update_output_text(
+                f"Added {pack.name} ({count} files) to {res_dir}\n"
+            )
+
+    def seed_assets(self, rom_sha1):
+        """Reuse the assets an earlier build extracted from the same ROM with the same extractor."""
+        self.asset_cache_key = cache_key(self.parent.workspace, rom_sha1)
+        if self.asset_cache_key is None:
+            return
+        try:
+            seeded = seed_workspace(self.parent.workspace, self.asset_cache_key)
+        except OSError as e:
+            print(f"Error reusing extracted assets: {e}")
+            return
+        if seeded:
+            self.parent.ui_setup.output_text_manager.update_output_text(
+                f"[32m Reusing {seeded} assets extracted by an earlier build [0m"
+            )
+
+    def save_assets(self):
+        if self.asset_cache_key is None:
+            return
+        try:
+            saved = save_workspace(self.parent.workspace, self.asset_cache_key)
+            if saved:
+                print(f"Cached {saved} extracted assets")
+        except (OSError, ValueError) as e:
+            print(f"Error caching extracted assets: {e}")
+        self.asset_cache_key = None
+
+    def set_build_process(self, process):
+        self.build_process = process
+
+    def on_build_output(self, text):
+        if self.failure_detector and self.failure_detector.feed(text):
+            grace_seconds = get_setting("abort_grace_seconds")
+            self.parent.ui_setup.output_text_manager.update_output_text(
+                f"[31m Fatal error detected, stopping the build in {grace_seconds}s... [0m"
+            )
+            QTimer.singleShot(
+                int(grace_seconds * 1000),
+                lambda process=self.build_process: self.abort_build(process),
+            )
+
+        if self.progress_estimator and self.progress_estimator.feed(text):
+            fraction = self.progress_estimator.fraction()
+            self.parent.ui_setup.update_build_progress(
+                int((fraction or 0) * 100), self.progress_estimator.eta_seconds()
+            )
+
+    def abort_build(self, process):
+        """Stop a build that already hit a fatal error instead of letting other jobs run on."""
+        if process is None or process is not self.build_process:
+            return
+        self.build_aborted = True
+        self.build_process.abort()
+
     def build_finished(self, success):
+        if success and self.progress_estimator:
+            self.progress_estimator.record()
+        self.progress_estimator = None
+        self.build_process = None
+        self.parent.ui_setup.finish_build_progress(success)
+
         if success:
             self.parent.ui_setup.output_text_manager.update_output_text(
                 "[32m Build completed successfully! [0m"
             )
+            # Before the install, which deletes the workspace
+            self.save_assets()
+            self.failure_detector = None
+            # Finishes the build log and re-enables Build once installed
             self.handle_post_install()
 
         else:
-            self.parent.ui_setup.output_text_manager.update_output_text(
-                "[31m Build failed. Check the output for errors. [0m"
-            )
-        self.parent.ui_setup.set_build_button_enabled(True)
+            if not self.report_diagnostics():
+                self.parent.ui_setup.output_text_manager.update_output_text(
+                    "[31m Build failed. Check the output for errors. [0m"
+                )
+            self.finish_build_log("failed")
+            self.failure_detector = None
+            self.parent.ui_setup.set_build_button_enabled(True)
+
+    def report_diagnostics(self):
+        """
+        Show the collected fatal errors, summary first, and scroll the
+        output so the result starts at the top. Returns False if there
+        were none.
+        """
+        diagnostics = self.failure_detector.diagnostics if self.failure_detector else []
+        if not diagnostics:
+            return False
+
+        summary = f"Build failed with {len(diagnostics)} error(s)"
+        if self.build_aborted:
+            summary += " (remaining jobs were stopped early)"
+        output = self.parent.ui_setup.output_text_manager
+        summary_line = output.spool.line_count
+        output.update_output_text(f"[31m ===== {summary} ===== [0m")
+        for diagnostic in diagnostics:
+            output.update_output_text(f"[31m   {format_diagnostic(diagnostic)} [0m")
+        output.scroll_to_line(summary_line)
+        return True
 
     def load_repo_configs(self):
-        repo_configs = {}
-        config_dir = os.path.join(BASE_PATH, "config", "repos")
-
-        for filename in os.listdir(config_dir):
-            if filename.endswith(".yaml"):
-                with open(os.path.join(config_dir, filename), "r") as file:
-                    config = yaml.safe_load(file)
-                    for repo in config:
-                        repo_configs[repo["name"]] = repo
-
-        return repo_configs
+        registry = self.parent.repo_manager.registry
+        return dict(registry.by_name) if registry else {}
 
     def create_checkbox_handler(window, opt_name):
         def handler(state):
@@ -93,55 +292,12 @@ class BuildManager:
             return
 
         if repo_options is None:
-            repo_options = self.parent.repo_options.get(current_repo, {})
+            repo_options = self.parent.repo_options
 
         if not repo_options:
             print(f"No options found for repository: {current_repo}")
-            return
 
-        # Store current selections
-        current_selections = self.user_selections.copy()
-
-        # Clear the layout and disconnect signals
-        self.clear_options_layout()
-
-        # Restore selections, using recommended or default values for new options
-        for opt_name, opt_info in repo_options.items():
-            if opt_name in current_selections:
-                # Restore previous selection
-                self.update_user_selection(opt_name, current_selections[opt_name])
-            else:
-                # New option: use recommended or default value
-                recommended_value = opt_info.get("recommended")
-                default_value = opt_info.get("default")
-                if recommended_value is not None:
-                    self.update_user_selection(opt_name, recommended_value)
-                elif default_value is not None:
-                    self.update_user_selection(opt_name, default_value)
-
-        # Update UI widgets with current selections
-        self.update_ui_widgets()
-
-    def clear_options_layout(self):
-        layout = self.parent.ui_setup.options_layout
-        while layout.count():
-            item = layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.setParent(None)
-
-    def update_ui_widgets(self):
-        for opt_name, value in self.user_selections.items():
-            widget = self.parent.ui_setup.options_layout.findChild(
-                QWidget, f"{opt_name}_widget"
-            )
-            if widget:
-                if isinstance(widget, QCheckBox):
-                    widget.setChecked(bool(value))
-                elif isinstance(widget, QComboBox):
-                    widget.setCurrentText(str(value))
-                elif isinstance(widget, QSpinBox):
-                    widget.setValue(int(value))
+        self.parent.ui_setup.build_options_manager.set_repo(current_repo, repo_options)
 
     def update_user_selection(self, option_name, value):
         old_value = self.user_selections.get(option_name, None)
@@ -149,6 +305,45 @@ class BuildManager:
         print(f"BuildManager: Updated {option_name} from {old_value} to {value}")
         print(f"Current user_selections: {self.user_selections}")
 
+    def install_variant(self, region, target_dir, repo_name, packs=()):
+        install_dir = find_build_dir(self.parent.workspace, region)
+        if install_dir is None:
+            self.parent.ui_setup.output_text_manager.update_output_text(
+                f"[31m No build output found for region {region}. [0m"
+            )
+            return
+        print(f"Install directory: {install_dir}")
+
+        # Rename the executable (the first file starting with 'sm64') before
+        # installing, so a rebuild overwrites the installed copy in place
+        for filename in os.listdir(install_dir):
+            if filename.startswith("sm64"):
+                old_path = os.path.join(install_dir, filename)
+                new_path = os.path.join(install_dir, repo_name)
+                os.rename(old_path, new_path)
+                print(f"Renamed {old_path} to {new_path}")
+                break  # Exit after renaming the first match
+        self.install_asset_packs(install_dir, packs)
+
+        # Installed as a new generation; unchanged files are shared with the
+        # previous one. The workspace is deleted right after, so files can be
+        # moved instead of copied
+        generation, result = install_generation(
+            install_dir,
+            target_dir,
+            consume_source=True,
+            keep=get_setting("install_generations_kept"),
+        )
+        where = (
+            target_dir
+            if generation is None
+            else f"{target_dir} (generation {generation})"
+        )
+        print(f"Installed {install_dir} to {where}: {result.describe()}")
+        self.parent.ui_setup.output_text_manager.update_output_text(
+            f"Installed {region.upper()} to {where}: {result.describe()}\n"
+        )
+
     def get_build_target(self):
         if self.user_selections.get("OSX_BUILD", 0) == 1:
             return "OSX"
@@ -163,43 +358,39 @@ class BuildManager:
         else:
             return "Linux"
 
-    def handle_post_install(self):
-        install_dir = os.path.join(self.parent.workspace, "build/us_pc/")
-        print(f"Install directory: {install_dir}")
+    def handle_post_install(self, waiting=False):
+        if self.asset_packs is not None and not self.asset_packs.done():
+            # Usually long done: they were started with the clone. Checked
+            # again later rather than blocking the GUI thread
+            if not waiting:
+                self.parent.ui_setup.output_text_manager.update_output_text(
+                    "Waiting for asset packs...\n"
+                )
+            QTimer.singleShot(
+                self.ASSET_PACK_POLL_MS, lambda: self.handle_post_install(waiting=True)
+            )
+            return
+
         target_dir = self.parent.ui_setup.install_dir_entry.text()
         print(f"Target directory: {target_dir}")
-
-        def copy_and_overwrite(src, dst):
-            if os.path.isdir(src):
-                if not os.path.exists(dst):
-                    os.makedirs(dst)
-                for item in os.listdir(src):
-                    s = os.path.join(src, item)
-                    d = os.path.join(dst, item)
-                    copy_and_overwrite(s, d)
-            else:
-                shutil.copy2(src, dst)
-
-        # Copy and overwrite contents of install_dir to target_dir
-        copy_and_overwrite(install_dir, target_dir)
-        print(f"Copied contents from {install_dir} to {target_dir}")
-
         repo_name = self.parent.ui_setup.repo_url_combobox.currentText()
 
-        # Find the file that starts with 'sm64' and rename it to repo_name
-        for filename in os.listdir(target_dir):
-            if filename.startswith("sm64"):
-                old_path = os.path.join(target_dir, filename)
-                new_path = os.path.join(target_dir, repo_name)
-                os.rename(old_path, new_path)
-                print(f"Renamed {old_path} to {new_path}")
-                break  # Exit after renaming the first match
+        packs = []
+        if self.asset_packs is not None:
+            packs = self.asset_packs.results()
+            self.asset_packs = None
+
+        # The first region goes to the chosen directory, others next to it
+        for index, region in enumerate(self.build_regions or [self.parent.rom_region]):
+            region_target = (
+                target_dir if index == 0 else f"{target_dir.rstrip(os.sep)}-{region}"
+            )
+            self.install_variant(region, region_target, repo_name, packs)
 
-        # Delete the workspace directory recursively
+        # Moved aside right away and deleted in the background
         workspace_dir = self.parent.workspace
-        if os.path.exists(workspace_dir):
-            shutil.rmtree(workspace_dir)
-            print(f"Deleted workspace directory: {workspace_dir}")
+        if trash.move(workspace_dir):
+            print(f"Deleting workspace directory: {workspace_dir}")
 
         # Open the target directory in the user's GUI file manager
         QDesktopServices.openUrl(QUrl.fromLocalFile(target_dir))
@@ -209,3 +400,5 @@ class BuildManager:
         self.parent.ui_setup.output_text_manager.update_output_text(
             "Installation complete. Opening target directory.\n"
         )
+        self.finish_build_log("success")
+        self.parent.ui_setup.set_build_button_enabled(True)
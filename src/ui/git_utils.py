@@ -3,9 +3,9 @@ from typing import Any
 
 from PyQt6.QtCore import QObject, QThread, pyqtSignal, Qt
 from PyQt6.QtGui import QPixmap
-from yaml import safe_load
 
-from src.core.gitlogic import update_branch_menu, CloneWorker
+from core.build_options import repo_options
+from core.gitlogic import update_branch_menu, CloneWorker
 
 
 class CloningManager(QObject):
@@ -55,53 +55,41 @@ class CloningManager(QObject):
 
 
 def start_cloning(window: Any):
+    if not window.select_rom():
+        window.ui_setup.output_text_manager.update_output_text(
+            "[31mNo valid Super Mario 64 ROM selected. Build cancelled.[0m\n"
+        )
+        return
+
+    repo_name = window.ui_setup.repo_url_combobox.currentText()
+    window.build_manager.begin_build_log(repo_name)
     window.ui_setup.output_text_manager.update_output_text(
         "Starting cloning process...\n"
     )
     window.ui_setup.set_build_button_enabled(False)  # Disable the button
-    repo_name = window.ui_setup.repo_url_combobox.currentText()
-    repo = next((r for r in window.repo_manager.REPOS if r["name"] == repo_name), None)
+    repo = window.repo_manager.get_repo(repo_name)
     if repo:
         repo_url = repo.get("url")
-        branch = window.ui_setup.branch_menu.currentText()
+        # Empty while the branch list is still loading: clone the default branch
+        branch = window.ui_setup.branch_menu.currentText() or None
         clone_dir = os.path.abspath("./.workspace")
+        # Fetched alongside the clone and the build, installed afterwards
+        window.build_manager.start_asset_packs(repo)
         window.start_cloning(repo_url, clone_dir, branch)
     else:
-        window.ui_setup.update_output_text("Error: Selected repository not found.\n")
+        window.ui_setup.output_text_manager.update_output_text(
+            "Error: Selected repository not found.\n"
+        )
+        window.build_manager.finish_build_log("failed")
         window.ui_setup.set_build_button_enabled(
             True
         )  # Re-enable the button if there's an error
 
 
 def load_repos(repo_manager: Any):
-    # Try to find the config directory
-    from ui.signal_connections import BASE_PATH
-
-    config_dirs = [
-        os.path.join(BASE_PATH, "config", "repos"),
-    ]
-
-    repos_dir = next((d for d in config_dirs if d and os.path.exists(d)), None)
-
-    if not repos_dir:
-        print("Error: Could not find the config/repos directory")
-        return
-
-    repo_manager.REPOS = []
-
     try:
-        for filename in os.listdir(repos_dir):
-            if filename.endswith(".yaml"):
-                file_path = os.path.join(repos_dir, filename)
-                with open(file_path, "r") as file:
-                    data = safe_load(file)
-                    if isinstance(data, list):
-                        repo_manager.REPOS.extend(data)
-                    elif isinstance(data, dict):
-                        repo_manager.REPOS.append(data)
-
+        repo_manager.load_repos()
         repo_manager.populate_repo_urls()
-        print(f"Total repos loaded: {len(repo_manager.REPOS)}")
 
         # Populate fork menu with all repos
         window = repo_manager.parent
@@ -138,9 +126,7 @@ def connect_signals(self):
 def on_fork_selection(window: Any):
     fork_name = window.ui_setup.branch_combobox.currentText()
 
-    fork = next(
-        (repo for repo in window.repo_manager.REPOS if repo["name"] == fork_name), None
-    )
+    fork = window.repo_manager.get_repo(fork_name)
     if fork:
         window.repo_url = fork.get("url")
 
@@ -154,7 +140,7 @@ def on_fork_selection(window: Any):
         update_branch_menu(
             fork_name, window.repo_manager.REPOS, window.ui_setup.branch_menu
         )
-        window.repo_options = fork.get("options", {})
+        window.repo_options = repo_options(fork)
         window.build_manager.update_build_options(window.repo_options)
 
         # Update advanced options
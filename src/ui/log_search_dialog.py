@@ -0,0 +1,66 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFont
+from PyQt6.QtWidgets import (
+    QApplication,
+    QDialog,
+    QHBoxLayout,
+    QLineEdit,
+    QPlainTextEdit,
+    QPushButton,
+    QVBoxLayout,
+)
+
+from core.buildlog import LOG_DIR, search_logs
+
+
+class LogSearchDialog(QDialog):
+    RESULT_LIMIT = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Search Build Logs")
+        self.resize(900, 500)
+
+        self.query_entry = QLineEdit(self)
+        self.query_entry.setPlaceholderText('Search past builds, e.g. "error:"')
+        self.search_button = QPushButton("Search", self)
+        self.results = QPlainTextEdit(self)
+        self.results.setReadOnly(True)
+        self.results.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+
+        font = QFont("Courier")
+        font.setStyleHint(QFont.StyleHint.Monospace)
+        font.setPointSize(9)
+        self.results.setFont(font)
+
+        query_layout = QHBoxLayout()
+        query_layout.addWidget(self.query_entry)
+        query_layout.addWidget(self.search_button)
+        layout = QVBoxLayout(self)
+        layout.addLayout(query_layout)
+        layout.addWidget(self.results)
+
+        self.query_entry.returnPressed.connect(self.run_search)
+        self.search_button.clicked.connect(self.run_search)
+
+    def run_search(self):
+        pattern = self.query_entry.text().strip()
+        if not pattern:
+            return
+
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            matches = search_logs(pattern, limit=self.RESULT_LIMIT)
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        if not matches:
+            self.results.setPlainText(f"No matches for '{pattern}' in {LOG_DIR}")
+            return
+
+        lines = [
+            f"{match.build_id}:{match.line_number}: {match.text}" for match in matches
+        ]
+        if len(matches) >= self.RESULT_LIMIT:
+            lines.append(f"... stopped after {self.RESULT_LIMIT} matches")
+        self.results.setPlainText("\n".join(lines))
@@ -3,8 +3,11 @@ import os
 from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import QMainWindow
 
-from src.core.romfinder import N64RomValidator
+from core.cache_manager import start_background_gc
+from core.romfinder import N64RomValidator
+from core.trash import trash
 from ui.UIManagers.repo_manager import RepoManager
+from ui.UIManagers.rom_library_management import RomLibraryManager
 from .build_manager import BuildManager
 from .git_utils import CloningManager
 from .signal_connections import BASE_PATH
@@ -19,7 +22,11 @@ class Sixty4All(QMainWindow):
         self.build_manager = None  # Initialize as None
         self.cloning_manager = CloningManager()
         self.repo_url = ""
-        self.rom_region, self.rom_dir = N64RomValidator().find_or_select_file()
+        # Resolved from the ROM library when a build starts; rom_region and
+        # rom_dir are the first of rom_regions (region -> ROM path)
+        self.rom_region, self.rom_dir = None, None
+        self.rom_regions = {}
+        self.rom_library_manager = RomLibraryManager(self)
 
         self.build_dependencies = []
         self.workspace = os.path.abspath("./.workspace")
@@ -38,8 +45,32 @@ class Sixty4All(QMainWindow):
         self.ui_setup = UISetup(self)  # Create UISetup instance
         self.build_manager = BuildManager(self)  # Create BuildManager instance
         self.ui_setup.setup()
-        self.repo_manager.load_repos()
-        self.repo_manager.populate_repo_urls()  # Call this after ui_setup is created
+        # Enabled once the repo configs have been loaded
+        self.ui_setup.set_build_button_enabled(False)
+
+    def start_background_tasks(self):
+        """Load everything the first frame doesn't need, after the window is shown."""
+        self.repo_manager.load_repos_async()
+        self.rom_library_manager.start()
+        # Workspaces of builds the last session didn't get to delete
+        trash.purge_leftovers([os.path.dirname(self.workspace)])
+        # Cache eviction from the budget set last session, off the GUI thread
+        start_background_gc()
+
+    def select_rom(self):
+        """Pick the ROMs to build with, asking the user only if the library can't decide."""
+        validator = N64RomValidator()
+        library_files = [path for _, path in self.rom_library_manager.roms()]
+        valid_files = validator.validate_files(library_files)
+
+        self.rom_regions = validator.select_regions(valid_files)
+        if not self.rom_regions:
+            return False
+
+        self.rom_region, self.rom_dir = next(iter(self.rom_regions.items()))
+        for region, path in self.rom_regions.items():
+            self.rom_library_manager.library.add(region, path)
+        return True
 
     def update_progress_bar(self, value):
         self.ui_setup.update_progress_bar(value)
@@ -49,7 +80,7 @@ class Sixty4All(QMainWindow):
 
     def start_cloning(self, repo_url, clone_dir, branch):
         self.ui_setup.output_text_manager.update_output_text(
-            f"Initiating cloning: {repo_url} to {clone_dir} (branch: {branch})\n"
+            f"Initiating cloning: {repo_url} to {clone_dir} (branch: {branch or 'default'})\n"
         )
         self.cloning_manager.progress_signal.connect(self.update_progress_bar)
         self.cloning_manager.text_signal.connect(self.update_output_text)
@@ -66,6 +97,7 @@ class Sixty4All(QMainWindow):
                 "[31mCloning failed. Check the output for errors.[0m\n"
             )
             self.update_output_text("[33mYou may need to try cloning again.[0m\n")
+            self.build_manager.finish_build_log("clone failed")
 
     def update_build_options(self, repo_options):
         self.build_manager.update_build_options(repo_options)
@@ -74,5 +106,8 @@ class Sixty4All(QMainWindow):
         self.ui_setup.update_advanced_options()
 
     def closeEvent(self, event):
+        self.build_manager.finish_build_log("interrupted")
+        self.repo_manager.cleanup()
+        self.rom_library_manager.cleanup()
         self.ui_setup.cleanup()
         super().closeEvent(event)
@@ -1,7 +1,7 @@
 import os
 import sys
 
-from src.ui.git_utils import start_cloning
+from ui.git_utils import start_cloning
 
 if getattr(sys, "frozen", False):
     # Running in a PyInstaller bundle
@@ -0,0 +1,116 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+from PyQt6.QtCore import QObject, QRunnable, QSize, Qt, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+from core.paths import CACHE_DIR, ensure_dir
+
+THUMBNAIL_DIR = os.path.join(CACHE_DIR, "thumbnails")
+
+
+def thumbnail_path(source_path, size, cache_dir=THUMBNAIL_DIR):
+    """Disk cache location of a thumbnail, keyed by the source's content and the target size."""
+    with open(source_path, "rb") as file:
+        source_hash = hashlib.sha1(file.read()).hexdigest()
+    return os.path.join(cache_dir, f"{source_hash}_{size.width()}x{size.height()}.png")
+
+
+def load_thumbnail(source_path, size, cache_dir=THUMBNAIL_DIR):
+    """
+    Return a QImage of the source scaled to fit ``size``, creating it if needed.
+
+    QImageReader decodes straight to the target size (JPEGs are downscaled by
+    the decoder itself), and the result is written to the disk cache so later
+    runs only read a small PNG.
+    """
+    cached_path = thumbnail_path(source_path, size, cache_dir)
+    if os.path.exists(cached_path):
+        image = QImage(cached_path)
+        if not image.isNull():
+            return image
+
+    reader = QImageReader(source_path)
+    reader.setAutoTransform(True)
+    source_size = reader.size()
+    if source_size.isValid():
+        reader.setScaledSize(
+            source_size.scaled(size, Qt.AspectRatioMode.KeepAspectRatio)
+        )
+    image = reader.read()
+    if image.isNull():
+        print(f"Failed to load image: {source_path}: {reader.errorString()}")
+        return image
+
+    try:
+        ensure_dir(cache_dir)
+        temp_path = f"{cached_path}.tmp"
+        if image.save(temp_path, "PNG"):
+            os.replace(temp_path, cached_path)
+    except OSError as e:
+        print(f"Error saving thumbnail for {source_path}: {e}")
+    return image
+
+
+class ThumbnailSignals(QObject):
+    loaded = pyqtSignal(str, QImage)
+
+
+class ThumbnailTask(QRunnable):
+    def __init__(self, source_path, size, signals):
+        super().__init__()
+        self.source_path = source_path
+        self.size = size
+        self.signals = signals
+
+    def run(self):
+        try:
+            image = load_thumbnail(self.source_path, self.size)
+        except Exception as e:
+            print(f"Error creating thumbnail for {self.source_path}: {e}")
+            image = QImage()
+        self.signals.loaded.emit(self.source_path, image)
+
+
+class ThumbnailCache(QObject):
+    """
+    Repo preview images, decoded off the GUI thread and kept in an LRU.
+
+    ``request`` returns the pixmap right away when it is in memory; otherwise
+    it starts a background load and ``thumbnail_ready`` fires once it's done.
+    """
+
+    thumbnail_ready = pyqtSignal(str, QPixmap)
+    MAX_MEMORY_ENTRIES = 32
+
+    def __init__(self, size=QSize(300, 200), parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.pixmaps = OrderedDict()
+        self.pending = set()
+        self.signals = ThumbnailSignals()
+        self.signals.loaded.connect(self.on_loaded)
+
+    def request(self, source_path):
+        pixmap = self.pixmaps.get(source_path)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(source_path)
+            return pixmap
+
+        if source_path not in self.pending:
+            self.pending.add(source_path)
+            QThreadPool.globalInstance().start(
+                ThumbnailTask(source_path, self.size, self.signals)
+            )
+        return None
+
+    def on_loaded(self, source_path, image):
+        self.pending.discard(source_path)
+        # QPixmaps may only be created on the GUI thread
+        pixmap = QPixmap.fromImage(image)
+        if not pixmap.isNull():
+            self.pixmaps[source_path] = pixmap
+            while len(self.pixmaps) > self.MAX_MEMORY_ENTRIES:
+                self.pixmaps.popitem(last=False)
+        self.thumbnail_ready.emit(source_path, pixmap)
@@ -16,12 +16,15 @@ from PyQt6.QtWidgets import (
     QFrame,
 )
 
+from core.build_progress import format_duration
+from ui.UIManagers.branch_menu_management import BranchMenuManager
 from ui.UIManagers.build_options_management import BuildOptionsManager
 from ui.UIManagers.cloning_management import CloningFinishHandler
 from ui.UIManagers.color_management import ColorManager
 from ui.UIManagers.output_text_management import OutputTextManager
 from ui.UIManagers.repo_info_management import RepoInfoManager
 from ui.git_utils import CloningManager
+from ui.log_search_dialog import LogSearchDialog
 
 
 class UISetup:
@@ -34,6 +37,7 @@ class UISetup:
             self.output_text, self.color_manager
         )
         self.repo_info_manager = RepoInfoManager(self)
+        self.branch_menu_manager = BranchMenuManager(self)
         self.build_options_manager = BuildOptionsManager(self)
         self.cloning_finish_handler = CloningFinishHandler(self)
         self.cloning_manager = CloningManager()
@@ -50,6 +54,7 @@ class UISetup:
         self.advanced_checkbox = QCheckBox("Show advanced options")
         self.browse_button = QPushButton("Browse...", self.parent)
         self.clone_button = QPushButton("Build", self.parent)
+        self.search_logs_button = QPushButton("Search Logs...", self.parent)
         self.options_widget = QWidget()
         self.options_layout = QGridLayout(self.options_widget)
         self.branch_combobox = QComboBox()
@@ -90,6 +95,7 @@ class UISetup:
     def setup_signals(self):
         self.repo_url_combobox.currentIndexChanged.connect(self.on_repo_selection)
         self.advanced_checkbox.stateChanged.connect(self.update_advanced_options)
+        self.search_logs_button.clicked.connect(self.show_log_search)
         self.cloning_manager.progress_signal.connect(self.update_progress_bar)
         self.cloning_manager.text_signal.connect(
             self.output_text_manager.update_output_text
@@ -165,7 +171,10 @@ class UISetup:
         grid_layout.addWidget(self.advanced_checkbox, 3, 0, 1, 2)
         grid_layout.addWidget(self.options_widget, 4, 0, 1, 2)
 
-        grid_layout.addWidget(self.clone_button, 5, 0, 1, 2)
+        build_layout = QHBoxLayout()
+        build_layout.addWidget(self.clone_button, 1)
+        build_layout.addWidget(self.search_logs_button)
+        grid_layout.addLayout(build_layout, 5, 0, 1, 2)
 
         grid_layout.addWidget(self.progress_bar, 6, 0, 1, 2)
 
@@ -180,8 +189,26 @@ class UISetup:
         self.build_options_manager.update_advanced_options()
 
     def update_progress_bar(self, value):
+        self.progress_bar.setFormat("%p%")
         self.progress_bar.setValue(value)
 
+    def update_build_progress(self, percent, eta_seconds):
+        if eta_seconds is None:
+            self.progress_bar.setFormat("Compiling... %p%")
+        else:
+            self.progress_bar.setFormat(
+                f"Compiling... %p% (about {format_duration(eta_seconds)} left)"
+            )
+        self.progress_bar.setValue(percent)
+
+    def finish_build_progress(self, success):
+        self.progress_bar.setFormat("%p%")
+        if success:
+            self.progress_bar.setValue(100)
+
+    def show_log_search(self):
+        LogSearchDialog(self.parent).exec()
+
     def set_build_button_enabled(self, enabled):
         self.clone_button.setEnabled(enabled)
 
@@ -189,4 +216,5 @@ class UISetup:
         self.cloning_manager.start_cloning(repo_url, clone_dir, branch)
 
     def cleanup(self):
+        self.branch_menu_manager.cleanup()
         self.output_text_manager.cleanup()
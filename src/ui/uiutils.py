@@ -20,3 +20,25 @@ def add_horizontal_widgets(window, *widgets_with_policies):
     # Add the horizontal layout to the main layout
     window.addLayout(horizontal_layout)
     return horizontal_layout
+
+
+def sync_combobox_items(combobox, items):
+    """
+    Make a combobox list exactly ``items`` with as few inserts/removes as possible.
+
+    Items that stay keep their QComboBox entry, so the current selection is
+    preserved unless it was removed. Signals are left to the caller to block.
+    """
+    wanted = set(items)
+    for index in reversed(range(combobox.count())):
+        if combobox.itemText(index) not in wanted:
+            combobox.removeItem(index)
+
+    for index, item in enumerate(items):
+        if index < combobox.count() and combobox.itemText(index) == item:
+            continue
+        existing = combobox.findText(item)
+        if existing != -1:
+            # Reordered: move it rather than adding a duplicate
+            combobox.removeItem(existing)
+        combobox.insertItem(index, item)